@@ -17,7 +17,7 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from app.database import Base
-from app.models import User, Agent, Workflow, WorkflowNode, WorkflowEdge, WorkflowRun, NodeRun, CustomNode, Integration  # noqa: F401
+from app.models import User, Agent, Workflow, WorkflowNode, WorkflowEdge, WorkflowTrigger, WorkflowRun, NodeRun, CustomNode, Integration  # noqa: F401
 
 target_metadata = Base.metadata
 
@@ -54,17 +54,20 @@ def do_run_migrations(connection: Connection) -> None:
 
 async def run_async_migrations() -> None:
     from app.config import get_settings
+    from sqlalchemy.ext.asyncio import create_async_engine
     settings = get_settings()
-    sync_url = settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://")
 
-    configuration = config.get_section(config.config_ini_section, {})
-    configuration["sqlalchemy.url"] = sync_url
-
-    from sqlalchemy import create_engine
-    connectable = create_engine(sync_url, poolclass=pool.NullPool)
-    with connectable.connect() as connection:
-        do_run_migrations(connection)
-    connectable.dispose()
+    # Keep the default pool so repeated programmatic runs (tests, CI) reuse an
+    # authenticated connection; ALEMBIC_NULLPOOL=1 restores connect-per-use.
+    engine_kwargs = {}
+    if os.environ.get("ALEMBIC_NULLPOOL") == "1":
+        engine_kwargs["poolclass"] = pool.NullPool
+    # Use the app's asyncpg URL directly instead of rewriting it to a sync driver
+    connectable = create_async_engine(settings.DATABASE_URL, **engine_kwargs)
+    # All migration steps share this one connection and a single transaction
+    async with connectable.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    await connectable.dispose()
 
 
 def run_migrations_online() -> None:
@@ -0,0 +1,34 @@
+"""baseline schema
+
+The tables as init_db()'s create_all built them before migrations were
+tracked. Stamp an existing database with this revision, then upgrade:
+
+    alembic stamp 23bcc09dc7b8
+    alembic upgrade head
+
+A database created from scratch by init_db() already has the current schema
+and only needs ``alembic stamp head``.
+
+Revision ID: 23bcc09dc7b8
+Revises:
+Create Date: 2026-10-14 18:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+
+# revision identifiers, used by Alembic.
+revision: str = '23bcc09dc7b8'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    pass
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    pass
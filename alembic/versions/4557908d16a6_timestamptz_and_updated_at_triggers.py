@@ -0,0 +1,68 @@
+"""timestamptz timestamps and updated_at triggers
+
+Stored values were naive UTC (datetime.utcnow), so they are read as UTC.
+
+Revision ID: 4557908d16a6
+Revises: b2cf7ba477e9
+Create Date: 2026-10-14 18:33:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4557908d16a6'
+down_revision: Union[str, Sequence[str], None] = 'b2cf7ba477e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column, has a now() server default)
+COLUMNS = [
+    ('users', 'created_at', True),
+    ('users', 'updated_at', True),
+    ('workflows', 'created_at', True),
+    ('workflows', 'updated_at', True),
+    ('workflow_runs', 'started_at', True),
+    ('workflow_runs', 'completed_at', False),
+    ('node_runs', 'started_at', True),
+    ('node_runs', 'completed_at', False),
+]
+TRIGGER_TABLES = ['users', 'workflows']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, column, has_default in COLUMNS:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE timestamptz USING {column} AT TIME ZONE 'UTC'")
+        if has_default:
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT now()")
+
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION set_updated_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at = now();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table in TRIGGER_TABLES:
+        op.execute(
+            f"CREATE TRIGGER trg_{table}_updated_at BEFORE UPDATE ON {table} "
+            "FOR EACH ROW EXECUTE FUNCTION set_updated_at()"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TRIGGER_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_updated_at ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS set_updated_at()")
+
+    for table, column, has_default in COLUMNS:
+        if has_default:
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} DROP DEFAULT")
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE timestamp USING {column} AT TIME ZONE 'UTC'")
@@ -0,0 +1,41 @@
+"""workflow_runs.user_id
+
+Revision ID: 470fb78eea0d
+Revises: 23bcc09dc7b8
+Create Date: 2026-10-14 18:31:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '470fb78eea0d'
+down_revision: Union[str, Sequence[str], None] = '23bcc09dc7b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable first so existing rows can be backfilled from their workflow
+    op.add_column('workflow_runs', sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=True))
+    op.execute(
+        """
+        UPDATE workflow_runs AS r
+        SET user_id = w.user_id
+        FROM workflows AS w
+        WHERE w.id = r.workflow_id
+        """
+    )
+    op.alter_column('workflow_runs', 'user_id', nullable=False)
+    op.create_foreign_key('workflow_runs_user_id_fkey', 'workflow_runs', 'users', ['user_id'], ['id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('workflow_runs_user_id_fkey', 'workflow_runs', type_='foreignkey')
+    op.drop_column('workflow_runs', 'user_id')
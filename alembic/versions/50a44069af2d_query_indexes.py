@@ -0,0 +1,66 @@
+"""indexes for the run, workflow and integration queries
+
+Plain CREATE INDEX, since env.py runs every step in one transaction; on a
+large workflow_runs table expect writes to block while these build.
+
+Revision ID: 50a44069af2d
+Revises: cb5b7ec40ea3
+Create Date: 2026-10-14 18:36:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '50a44069af2d'
+down_revision: Union[str, Sequence[str], None] = 'cb5b7ec40ea3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_runs_workflow_started', 'workflow_runs', ['workflow_id', sa.text('started_at DESC')])
+    op.create_index('ix_runs_user_started', 'workflow_runs', ['user_id', sa.text('started_at DESC')])
+    op.create_index('brin_runs_started', 'workflow_runs', ['started_at'], postgresql_using='brin')
+    op.create_index(
+        'gin_runs_input',
+        'workflow_runs',
+        ['input_payload'],
+        postgresql_using='gin',
+        postgresql_ops={'input_payload': 'jsonb_path_ops'},
+    )
+    op.create_index(
+        'ix_runs_active',
+        'workflow_runs',
+        ['workflow_id', 'started_at'],
+        postgresql_where=sa.text("status IN ('pending', 'running')"),
+    )
+    op.create_index('ix_node_runs_run_id', 'node_runs', ['run_id'])
+
+    op.create_index('ix_workflows_user_status', 'workflows', ['user_id', 'status'])
+    op.create_index('ix_workflows_published', 'workflows', ['id'], postgresql_where=sa.text("status = 'published'"))
+
+    op.create_index('ix_integrations_user', 'integrations', ['user_id'])
+    op.create_index('ix_integrations_type_status', 'integrations', ['type', 'status'])
+    op.create_index('ix_agents_user', 'agents', ['user_id'])
+    op.create_index('ix_custom_nodes_user', 'custom_nodes', ['user_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_custom_nodes_user', table_name='custom_nodes')
+    op.drop_index('ix_agents_user', table_name='agents')
+    op.drop_index('ix_integrations_type_status', table_name='integrations')
+    op.drop_index('ix_integrations_user', table_name='integrations')
+    op.drop_index('ix_workflows_published', table_name='workflows')
+    op.drop_index('ix_workflows_user_status', table_name='workflows')
+    op.drop_index('ix_node_runs_run_id', table_name='node_runs')
+    op.drop_index('ix_runs_active', table_name='workflow_runs')
+    op.drop_index('gin_runs_input', table_name='workflow_runs')
+    op.drop_index('brin_runs_started', table_name='workflow_runs')
+    op.drop_index('ix_runs_user_started', table_name='workflow_runs')
+    op.drop_index('ix_runs_workflow_started', table_name='workflow_runs')
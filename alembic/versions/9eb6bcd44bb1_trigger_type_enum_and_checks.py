@@ -0,0 +1,56 @@
+"""trigger_type enum, payload size and node_key length checks
+
+The CHECK constraints are added NOT VALID: they apply to new and updated rows
+without failing the upgrade on historical rows that exceed them. Run
+``ALTER TABLE ... VALIDATE CONSTRAINT`` once those rows are cleaned up.
+
+Revision ID: 9eb6bcd44bb1
+Revises: 4557908d16a6
+Create Date: 2026-10-14 18:34:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9eb6bcd44bb1'
+down_revision: Union[str, Sequence[str], None] = '4557908d16a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGGER_TYPES = ('manual', 'webhook', 'gmail', 'schedule', 'api')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    postgresql.ENUM(*TRIGGER_TYPES, name='trigger_type').create(op.get_bind())
+    # The old free-form column defaulted to 'manual'; fold anything else into it
+    known = ", ".join(f"'{value}'" for value in TRIGGER_TYPES)
+    op.execute(
+        "UPDATE workflow_runs SET trigger_type = 'manual' "
+        f"WHERE trigger_type IS NULL OR trigger_type NOT IN ({known})"
+    )
+    op.execute(
+        "ALTER TABLE workflow_runs ALTER COLUMN trigger_type TYPE trigger_type "
+        "USING trigger_type::trigger_type"
+    )
+
+    op.execute(
+        "ALTER TABLE workflow_runs ADD CONSTRAINT ck_workflow_runs_input_payload_size "
+        "CHECK (pg_column_size(input_payload) < 1048576) NOT VALID"
+    )
+    op.execute(
+        "ALTER TABLE workflow_nodes ADD CONSTRAINT ck_workflow_nodes_node_key_len "
+        "CHECK (length(node_key) <= 64) NOT VALID"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('ck_workflow_nodes_node_key_len', 'workflow_nodes', type_='check')
+    op.drop_constraint('ck_workflow_runs_input_payload_size', 'workflow_runs', type_='check')
+    op.execute("ALTER TABLE workflow_runs ALTER COLUMN trigger_type TYPE varchar(50) USING trigger_type::text")
+    postgresql.ENUM(name='trigger_type').drop(op.get_bind())
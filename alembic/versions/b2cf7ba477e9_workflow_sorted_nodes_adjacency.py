@@ -0,0 +1,43 @@
+"""workflows.sorted_nodes and workflows.adjacency
+
+Existing workflows start with empty values; the executor compiles the graph
+on their next run and stores it.
+
+Revision ID: b2cf7ba477e9
+Revises: 470fb78eea0d
+Create Date: 2026-10-14 18:32:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2cf7ba477e9'
+down_revision: Union[str, Sequence[str], None] = '470fb78eea0d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'workflows',
+        sa.Column('sorted_nodes', postgresql.JSONB(), nullable=True, server_default=sa.text("'[]'::jsonb")),
+    )
+    op.add_column(
+        'workflows',
+        sa.Column('adjacency', postgresql.JSONB(), nullable=True, server_default=sa.text("'{}'::jsonb")),
+    )
+    # The models set these client-side, as create_all would have
+    op.alter_column('workflows', 'sorted_nodes', server_default=None)
+    op.alter_column('workflows', 'adjacency', server_default=None)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('workflows', 'adjacency')
+    op.drop_column('workflows', 'sorted_nodes')
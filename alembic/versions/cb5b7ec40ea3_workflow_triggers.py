@@ -0,0 +1,58 @@
+"""workflow_triggers table
+
+Backfilled from existing email_trigger nodes, matching what the workflow
+routes write on save.
+
+Revision ID: cb5b7ec40ea3
+Revises: 9eb6bcd44bb1
+Create Date: 2026-10-14 18:35:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cb5b7ec40ea3'
+down_revision: Union[str, Sequence[str], None] = '9eb6bcd44bb1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # init_db()'s create_all adds missing tables on startup, so a server
+    # started on the new code before this upgrade has already created it
+    if not sa.inspect(op.get_bind()).has_table('workflow_triggers'):
+        op.create_table(
+            'workflow_triggers',
+            sa.Column('workflow_id', postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column('integration_id', postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column('type', sa.String(length=50), nullable=False),
+            sa.ForeignKeyConstraint(['workflow_id'], ['workflows.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('workflow_id', 'integration_id', 'type'),
+        )
+        op.create_index('ix_workflow_triggers_integration_type', 'workflow_triggers', ['integration_id', 'type'])
+
+    # Only well-formed ids, as _trigger_rows skips values UUID() rejects
+    op.execute(
+        r"""
+        INSERT INTO workflow_triggers (workflow_id, integration_id, type)
+        SELECT DISTINCT workflow_id, (data -> 'trigger_config' ->> 'integration_id')::uuid, type
+        FROM workflow_nodes
+        WHERE type = 'email_trigger'
+          AND jsonb_typeof(data -> 'trigger_config') = 'object'
+          AND data -> 'trigger_config' ->> 'integration_id'
+              ~* '^\{?[0-9a-f]{8}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{12}\}?$'
+        ON CONFLICT DO NOTHING
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_workflow_triggers_integration_type', table_name='workflow_triggers')
+    op.drop_table('workflow_triggers')
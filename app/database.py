@@ -1,10 +1,48 @@
+import orjson
+from sqlalchemy import DDL, Table, event, func
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import NullPool
 from app.config import get_settings
 
 settings = get_settings()
 
-engine = create_async_engine(settings.DATABASE_URL, echo=False, future=True)
+
+def _json_serializer(value) -> str:
+    # orjson is several times faster than stdlib json for the large JSONB
+    # payloads (email bodies, node inputs/outputs); non-str keys are
+    # stringified the same way json.dumps does.
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+if settings.DB_NULLPOOL:
+    _pool_kwargs = {"poolclass": NullPool}
+else:
+    _pool_kwargs = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+        "pool_use_lifo": settings.DB_POOL_USE_LIFO,
+    }
+
+engine = create_async_engine(
+    settings.DATABASE_URL,
+    echo=False,
+    future=True,
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
+    **_pool_kwargs,
+)
+# Keep (DB_POOL_SIZE + DB_MAX_OVERFLOW) x workers below Postgres max_connections.
+# Long-running callers (the Gmail poller, workflow runs) must open short-lived
+# sessions from async_session rather than hold one connection across external calls.
+
+# Create routes serialize the instance straight after flush(). That needs no
+# reload because defaults are either Python-side (uuid7 ids) or fetched in the
+# same statement via RETURNING (eager_defaults on models that use server
+# defaults), and expire_on_commit=False keeps attributes loaded past commit.
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
@@ -12,6 +50,52 @@ class Base(DeclarativeBase):
     pass
 
 
+def utcnow_sql():
+    """Server-side current time for timestamptz column defaults."""
+    return func.now()
+
+
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL(
+        """
+        CREATE OR REPLACE FUNCTION set_updated_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at = now();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    ),
+)
+
+
+def updated_at_trigger(table: Table) -> None:
+    """Have Postgres maintain table.updated_at on every UPDATE."""
+    event.listen(
+        table,
+        "after_create",
+        DDL(
+            f"CREATE TRIGGER trg_{table.name}_updated_at BEFORE UPDATE ON {table.name} "
+            "FOR EACH ROW EXECUTE FUNCTION set_updated_at()"
+        ),
+    )
+
+
+def pool_status() -> dict:
+    """Connection pool counters, for tuning pool size against real load."""
+    pool = engine.pool
+    if isinstance(pool, NullPool):
+        return {"pool": "null"}
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
+
+
 async def get_db() -> AsyncSession:
     async with async_session() as session:
         try:
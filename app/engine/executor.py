@@ -1,42 +1,135 @@
 """
 Workflow Execution Engine
 - Topological sort of nodes
-- Execute each node in order
+- Execute independent nodes concurrently as soon as their dependencies finish
 - Pass outputs to connected nodes
 - Handle errors with retry logic
 - Store logs per node
 """
 
+import asyncio
+import logging
 import time
 import traceback
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Any
-from collections import defaultdict, deque
+from collections import deque
+from functools import lru_cache
 
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import get_settings
 from app.models.workflow import Workflow, WorkflowNode
 from app.models.run import WorkflowRun, NodeRun
 from app.engine.node_handlers import get_node_handler
-from app.utils.expression import interpolate
+from app.utils.expression import FlatContext, interpolate_flat, has_expressions
+from app.utils.ids import uuid7
+
+# Node runs are buffered in memory and written in batches of this size,
+# with a final write when the workflow finishes.
+NODE_RUN_FLUSH_BATCH = 10
+
+# Full tracebacks are only captured in DEV_MODE / DEBUG logging, capped to their last 4KB
+MAX_TRACEBACK_CHARS = 4096
+
+# Mirrors ck_workflow_runs_input_payload_size on workflow_runs.input_payload
+MAX_INPUT_PAYLOAD_BYTES = 1_048_576
+
+logger = logging.getLogger(__name__)
+
+
+class PayloadTooLarge(ValueError):
+    """The trigger payload exceeds what workflow_runs.input_payload may store."""
+
+
+def _format_error(e: Exception) -> str:
+    """One-line error by default; the (truncated) traceback when debugging."""
+    if get_settings().DEV_MODE or logger.isEnabledFor(logging.DEBUG):
+        return traceback.format_exc()[-MAX_TRACEBACK_CHARS:]
+    return f"{type(e).__name__}: {e}"
+
+
+# Output keys kept in the in-memory context but not written to NodeRun.output_data
+# ("raw" is the full trigger payload, already stored as the run's input_payload)
+_MEMORY_ONLY_OUTPUT_KEYS = frozenset({"raw"})
+
+
+def _persisted_output(output: dict) -> dict:
+    if not _MEMORY_ONLY_OUTPUT_KEYS.intersection(output):
+        return output
+    return {k: v for k, v in output.items() if k not in _MEMORY_ONLY_OUTPUT_KEYS}
+
+
+async def bulk_insert_node_runs(db: AsyncSession, rows: list[dict[str, Any]]) -> None:
+    """
+    Insert node runs with one executemany round-trip. Every row must carry the
+    same keys (see _node_run_row); ids are generated here so no RETURNING is needed.
+    """
+    if rows:
+        await db.execute(insert(NodeRun), rows)
+
+
+def _node_run_row(node_run: NodeRun) -> dict[str, Any]:
+    return {
+        "id": node_run.id or uuid7(),
+        "run_id": node_run.run_id,
+        "node_id": node_run.node_id,
+        "node_key": node_run.node_key,
+        "status": node_run.status,
+        "input_data": node_run.input_data or {},
+        "output_data": node_run.output_data or {},
+        "error": node_run.error,
+        "execution_time_ms": node_run.execution_time_ms or 0.0,
+        "token_usage": node_run.token_usage,
+        "started_at": node_run.started_at,
+        "completed_at": node_run.completed_at,
+    }
+
+
+def _utcnow() -> datetime:
+    # Aware UTC to match the timestamptz run columns
+    return datetime.now(timezone.utc)
 
 
 class WorkflowExecutor:
     def __init__(self, db: AsyncSession):
         self.db = db
         self.context: dict[str, Any] = {}
+        # Dotted-path view of self.context; every write to the context goes
+        # through self._flat_ctx.set() so cached paths never go stale.
+        self._flat_ctx = FlatContext(self.context)
+        # Nodes run concurrently but share one AsyncSession, which does not
+        # allow overlapping operations — serialize every flush through this lock.
+        # NodeRun rows are only written once a node has finished; nothing reads
+        # the in-progress state mid-run, so it is kept in memory.
+        # Every write is committed straight away (expire_on_commit=False keeps
+        # the objects usable), so the session hands its connection back to the
+        # pool while nodes wait on external APIs instead of pinning it per run.
+        self._db_lock = asyncio.Lock()
+        self._pending_node_runs: list[NodeRun] = []
 
     async def execute(self, workflow: Workflow, input_payload: dict, trigger_type: str = "manual") -> WorkflowRun:
         # Create run record
         run = WorkflowRun(
             workflow_id=workflow.id,
+            user_id=workflow.user_id,
             status="running",
             trigger_type=trigger_type,
             input_payload=input_payload,
-            started_at=datetime.utcnow(),
+            started_at=_utcnow(),
         )
         self.db.add(run)
-        await self.db.flush()
+        try:
+            await self.db.commit()
+        except IntegrityError as e:
+            await self.db.rollback()
+            if "ck_workflow_runs_input_payload_size" in str(e.orig):
+                raise PayloadTooLarge(
+                    f"Trigger payload exceeds {MAX_INPUT_PAYLOAD_BYTES} bytes"
+                ) from e
+            raise
 
         # Build context
         self.context = {
@@ -44,36 +137,28 @@ class WorkflowExecutor:
             "workflow": {"variables": workflow.variables or {}, "id": str(workflow.id)},
             "env": {},
         }
+        self._flat_ctx = FlatContext(self.context)
 
         try:
-            # Build adjacency and get sorted order
             # Key by node_key (frontend string ID) so it matches edge source/target
             nodes_map = {(n.node_key or str(n.id)): n for n in workflow.nodes}
-            edges = workflow.edges
-            sorted_node_ids = self._topological_sort(nodes_map, edges)
-
-            # Execute nodes in order
-            for node_id in sorted_node_ids:
-                node = nodes_map.get(node_id)
-                if not node:
-                    continue
-
-                node_run = await self._execute_node(run, node)
-                if node_run.status == "failed":
-                    run.status = "failed"
-                    run.error = f"Node {node_id} failed: {node_run.error}"
-                    break
+            children, in_degree = self._workflow_graph(workflow, nodes_map)
+            failure = await self._run_scheduler(run, nodes_map, children, in_degree)
 
-            if run.status != "failed":
+            if failure is not None:
+                failed_id, failed_run = failure
+                run.status = "failed"
+                run.error = f"Node {failed_id} failed: {failed_run.error}"
+            else:
                 run.status = "completed"
                 run.output_payload = self.context.get("_last_output", {})
 
         except Exception as e:
             run.status = "failed"
-            run.error = traceback.format_exc()
+            run.error = _format_error(e)
 
-        run.completed_at = datetime.utcnow()
-        await self.db.flush()
+        run.completed_at = _utcnow()
+        await self._flush_node_runs()
         return run
 
     async def _execute_node(self, run: WorkflowRun, node: WorkflowNode) -> NodeRun:
@@ -81,69 +166,205 @@ class WorkflowExecutor:
             run_id=run.id,
             node_id=str(node.id),
             status="running",
-            started_at=datetime.utcnow(),
+            started_at=_utcnow(),
         )
-        self.db.add(node_run)
-        await self.db.flush()
 
-        start_time = time.time()
+        perf = time.perf_counter()
+        # Store output in context using node_key (frontend string ID like "trigger_1")
+        node_key = node.node_key or str(node.id)
+        published = False
+
+        def publish(output: dict) -> None:
+            nonlocal published
+            published = True
+            self._flat_ctx.set(node_key, {"output": output})
 
         try:
-            # Resolve expressions in node data
-            resolved_data = interpolate(node.data or {}, self.context)
+            # Resolve expressions in node data (static configs are used as-is)
+            node_data = node.data or {}
+            resolved_data = (
+                interpolate_flat(node_data, self._flat_ctx)
+                if has_expressions(node_data)
+                else node_data
+            )
             node_run.input_data = resolved_data
 
             # Get handler and execute
             handler = get_node_handler(node.type)
-            result = await handler.execute(resolved_data, self.context, self.db)
+            if handler.streams_partial_output:
+                result = await handler.execute(resolved_data, self.context, self.db, publish=publish)
+            else:
+                result = await handler.execute(resolved_data, self.context, self.db)
 
-            # Store output in context using node_key (frontend string ID like "trigger_1")
-            node_key = node.node_key or str(node.id)
-            self.context[node_key] = {"output": result.get("output", {})}
-            self.context["_last_output"] = result.get("output", {})
+            self._flat_ctx.set(node_key, {"output": result.get("output", {})})
+            self._flat_ctx.set("_last_output", result.get("output", {}))
 
             node_run.node_key = node_key
-            node_run.output_data = result.get("output", {})
+            node_run.output_data = _persisted_output(result.get("output", {}))
             node_run.token_usage = result.get("token_usage")
             node_run.status = "completed"
 
         except Exception as e:
             node_run.status = "failed"
-            node_run.error = traceback.format_exc()
+            node_run.error = _format_error(e)
+            if published:
+                # A failed node leaves no output behind, interim or otherwise
+                self._flat_ctx.discard(node_key)
 
-        elapsed = (time.time() - start_time) * 1000
+        elapsed = (time.perf_counter() - perf) * 1000
         node_run.execution_time_ms = elapsed
-        node_run.completed_at = datetime.utcnow()
-        await self.db.flush()
+        node_run.completed_at = _utcnow()
+        self._pending_node_runs.append(node_run)
+        if len(self._pending_node_runs) >= NODE_RUN_FLUSH_BATCH:
+            await self._flush_node_runs()
         return node_run
 
-    def _topological_sort(self, nodes_map: dict, edges: list) -> list[str]:
-        """Kahn's algorithm for topological sort."""
-        in_degree: dict[str, int] = defaultdict(int)
-        adjacency: dict[str, list[str]] = defaultdict(list)
+    async def _flush_node_runs(self) -> None:
+        """Flush pending ORM changes, bulk-insert the buffered node runs and commit."""
+        async with self._db_lock:
+            await self.db.flush()
+            if self._pending_node_runs:
+                pending, self._pending_node_runs = self._pending_node_runs, []
+                await bulk_insert_node_runs(self.db, [_node_run_row(nr) for nr in pending])
+            await self.db.commit()
+
+    async def _run_scheduler(
+        self,
+        run: WorkflowRun,
+        nodes_map: dict,
+        children: dict[str, tuple[str, ...]],
+        in_degree: dict[str, int],
+    ) -> tuple[str, NodeRun] | None:
+        """
+        Ready-set scheduler: every node whose dependencies have all completed is
+        dispatched as its own task, so independent branches overlap their I/O.
+        Returns (node_id, NodeRun) for the first failure, or None if every node completed.
+        Once a node fails no further nodes are dispatched; in-flight nodes are
+        allowed to finish so their runs are recorded. If a task raises (or the
+        scheduler itself is cancelled), the other in-flight tasks are cancelled
+        and awaited before the exception propagates.
+        """
+        remaining_deps = dict(in_degree)
+        running: dict[asyncio.Task, str] = {}
+        failure: tuple[str, NodeRun] | None = None
+
+        def dispatch(node_ids: list[str]) -> None:
+            pending = list(node_ids)
+            while pending:
+                node_id = pending.pop()
+                node = nodes_map.get(node_id)
+                if node is None:
+                    # Edge points at a node that no longer exists — treat it as
+                    # an empty pass-through so its dependents are not stranded.
+                    pending.extend(self._release_children(node_id, remaining_deps, children))
+                    continue
+                task = asyncio.create_task(self._execute_node(run, node))
+                running[task] = node_id
+
+        dispatch([nid for nid in nodes_map if remaining_deps[nid] == 0])
+
+        try:
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    node_id = running.pop(task)
+                    node_run = task.result()
+                    if node_run.status == "failed":
+                        if failure is None:
+                            failure = (node_id, node_run)
+                        continue
+                    if failure is None:
+                        dispatch(self._release_children(node_id, remaining_deps, children))
+        finally:
+            # Only non-empty when leaving on an exception; don't leave orphaned
+            # tasks writing to the shared session after the run is marked failed
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+        return failure
+
+    @staticmethod
+    def _release_children(
+        node_id: str, remaining_deps: dict[str, int], children: dict[str, tuple[str, ...]]
+    ) -> list[str]:
+        """Mark node_id as finished and return the children that just became ready."""
+        ready = []
+        for child in children.get(node_id, ()):
+            remaining_deps[child] -= 1
+            if remaining_deps[child] == 0:
+                ready.append(child)
+        return ready
+
+    @staticmethod
+    def _workflow_graph(workflow: Workflow, nodes_map: dict) -> tuple[dict, dict[str, int]]:
+        """
+        Children map and in-degrees for the scheduler. Uses the graph persisted
+        on save when present; older workflows are compiled here and backfilled.
+        """
+        if workflow.sorted_nodes:
+            children = workflow.adjacency or {}
+            in_degree = dict.fromkeys(nodes_map, 0)
+            for targets in children.values():
+                for target in targets:
+                    in_degree[target] = in_degree.get(target, 0) + 1
+            return children, in_degree
+
+        sorted_ids, children, in_degree = _compile_dag(tuple(nodes_map), _edge_pairs(workflow.edges))
+        if sorted_ids:
+            workflow.sorted_nodes = list(sorted_ids)
+            workflow.adjacency = {nid: list(targets) for nid, targets in children.items() if targets}
+        return children, in_degree
+
+
+def compile_graph(node_keys: list[str], edges: list) -> tuple[list[str], dict[str, list[str]]]:
+    """Topological order and adjacency to persist on a workflow when it is saved."""
+    sorted_ids, adjacency, _ = _compile_dag(tuple(node_keys), _edge_pairs(edges))
+    return list(sorted_ids), {nid: list(targets) for nid, targets in adjacency.items() if targets}
+
+
+def _edge_pairs(edges: list) -> tuple[tuple[str, str], ...]:
+    return tuple((edge.source, edge.target) for edge in edges)
+
 
-        all_node_ids = set(nodes_map.keys())
+@lru_cache(maxsize=256)
+def _compile_dag(
+    node_ids: tuple[str, ...], edge_pairs: tuple[tuple[str, str], ...]
+) -> tuple[tuple[str, ...], dict[str, tuple[str, ...]], dict[str, int]]:
+    """
+    Kahn's algorithm for topological sort, returning (sorted_ids, adjacency,
+    in_degree). Keyed on the graph structure itself, so every run of an
+    unchanged workflow reuses the result. The returned dicts are shared —
+    callers must copy in_degree before decrementing it.
+    """
+    # Common case: no edges, so every node is independent
+    if not edge_pairs:
+        return node_ids, {}, dict.fromkeys(node_ids, 0)
 
-        for edge in edges:
-            src = edge.source
-            tgt = edge.target
-            adjacency[src].append(tgt)
-            in_degree[tgt] += 1
+    in_degree: dict[str, int] = dict.fromkeys(node_ids, 0)
+    adjacency: dict[str, list[str]] = {nid: [] for nid in node_ids}
 
-        # Initialize in_degree for nodes with no incoming edges
-        for nid in all_node_ids:
-            if nid not in in_degree:
-                in_degree[nid] = 0
+    for src, tgt in edge_pairs:
+        if tgt not in in_degree:
+            # Edge points at a node that no longer exists; keep it in the graph
+            # so the scheduler can pass through it.
+            in_degree[tgt] = 0
+            adjacency[tgt] = []
+        if src not in adjacency:
+            adjacency[src] = []
+        adjacency[src].append(tgt)
+        in_degree[tgt] += 1
 
-        queue = deque([nid for nid in all_node_ids if in_degree[nid] == 0])
-        sorted_nodes = []
+    remaining = in_degree.copy()
+    queue = deque(nid for nid in node_ids if remaining[nid] == 0)
+    sorted_nodes = []
 
-        while queue:
-            current = queue.popleft()
-            sorted_nodes.append(current)
-            for neighbor in adjacency.get(current, []):
-                in_degree[neighbor] -= 1
-                if in_degree[neighbor] == 0:
-                    queue.append(neighbor)
+    while queue:
+        current = queue.popleft()
+        sorted_nodes.append(current)
+        for neighbor in adjacency[current]:
+            remaining[neighbor] -= 1
+            if remaining[neighbor] == 0:
+                queue.append(neighbor)
 
-        return sorted_nodes
+    return tuple(sorted_nodes), {nid: tuple(targets) for nid, targets in adjacency.items()}, in_degree
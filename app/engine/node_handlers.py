@@ -4,17 +4,83 @@ Focused on the Email → OpenAI Summary → Google Sheets demo workflow.
 All API keys and configuration are passed through node data fields.
 """
 
+import asyncio
+import hashlib
 import json
 import base64
+import logging
 import re
+import threading
+import time
 import httpx
 from abc import ABC, abstractmethod
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable
+from openai import AsyncOpenAI
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import get_settings
 from app.utils.expression import interpolate
 
+logger = logging.getLogger(__name__)
+
+try:
+    # Optional C-backed HTML parser; much faster than regex on large HTML bodies
+    from selectolax.parser import HTMLParser as _HTMLParser
+except ImportError:
+    _HTMLParser = None
+
+try:
+    # Optional SIMD base64 codec with the same API as the stdlib module
+    import pybase64 as _b64
+except ImportError:
+    _b64 = base64
+
+# Only this many decoded bytes of each attachment are passed on to the LLM
+MAX_ATTACHMENT_BYTES = 256 * 1024
+
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_WS_RE = re.compile(r"\s+")
+
+# Shared HTTP client so repeat calls to the same API reuse pooled keep-alive
+# connections instead of paying a TCP+TLS handshake per node execution.
+_HTTPX_CLIENT: httpx.AsyncClient | None = None
+_HTTPX_CLIENT_LOCK = asyncio.Lock()
+
+
+async def _get_httpx_client() -> httpx.AsyncClient:
+    global _HTTPX_CLIENT
+    if _HTTPX_CLIENT is None:
+        async with _HTTPX_CLIENT_LOCK:
+            if _HTTPX_CLIENT is None:
+                _HTTPX_CLIENT = httpx.AsyncClient(
+                    timeout=30.0,
+                    http2=True,
+                    limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+                )
+    return _HTTPX_CLIENT
+
+
+# Blocking google-api-python-client calls run on their own pool so they
+# cannot starve the default executor that FastAPI/asyncio rely on.
+_SHEETS_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="sheets")
+_sheets_local = threading.local()
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client (called on application shutdown)."""
+    global _HTTPX_CLIENT
+    if _HTTPX_CLIENT is not None:
+        await _HTTPX_CLIENT.aclose()
+        _HTTPX_CLIENT = None
+
 
 class BaseNodeHandler(ABC):
+    # Handlers that set this are called with publish=<callback>; each call
+    # replaces the node's interim output in the run context until it finishes
+    streams_partial_output = False
+
     @abstractmethod
     async def execute(self, data: dict, context: dict, db: AsyncSession) -> dict:
         """Execute the node and return result dict with 'output' key."""
@@ -68,8 +134,7 @@ class ExtractContentNodeHandler(BaseNodeHandler):
         attachments = data.get("attachments", [])
 
         # Strip HTML tags
-        clean_body = re.sub(r"<[^>]+>", " ", body)
-        clean_body = re.sub(r"\s+", " ", clean_body).strip()
+        clean_body = _strip_html(body)
 
         # Extract attachment text
         attachment_texts = []
@@ -80,7 +145,7 @@ class ExtractContentNodeHandler(BaseNodeHandler):
                     content = att.get("content", "")
                     if content:
                         try:
-                            decoded = base64.b64decode(content).decode("utf-8", errors="ignore")
+                            decoded = _decode_attachment(content)
                             attachment_texts.append(f"[Attachment: {name}]\n{decoded}")
                         except Exception:
                             attachment_texts.append(f"[Attachment: {name}] (binary, not decoded)")
@@ -102,16 +167,47 @@ class ExtractContentNodeHandler(BaseNodeHandler):
         }
 
 
+def _strip_html(body: str) -> str:
+    """Strip HTML tags and collapse whitespace into single spaces."""
+    if "<" not in body:
+        return " ".join(body.split())
+    if _HTMLParser is not None:
+        # Also decodes entities such as &amp; and &nbsp;
+        return " ".join(_HTMLParser(body).text(separator=" ").split())
+    return _WS_RE.sub(" ", _TAG_RE.sub(" ", body)).strip()
+
+
+def _decode_attachment(content: str) -> str:
+    """Decode base64 attachment content, keeping at most MAX_ATTACHMENT_BYTES."""
+    limit = MAX_ATTACHMENT_BYTES // 3 * 4  # base64 chars that decode to the byte budget
+    truncated = len(content) > limit
+    if truncated:
+        # Drop MIME line breaks, then cut on a 4-char boundary so padding stays valid
+        encoded = "".join(content[:limit].split())
+        encoded = encoded[: len(encoded) // 4 * 4]
+    else:
+        encoded = content
+    decoded = _b64.b64decode(encoded).decode("utf-8", errors="ignore")
+    return decoded + "\n... (truncated)" if truncated else decoded
+
+
 # ─── OpenAI Summarize ─────────────────────────────────────────────────────────
+# Seconds between interim output.partial updates while a summary streams
+SUMMARY_PARTIAL_INTERVAL = 0.2
+
+
 class SummarizeNodeHandler(BaseNodeHandler):
     """
     Sends extracted email content to OpenAI and returns a clean structured summary.
     API key is configured directly in the node — no env file needed.
+    The completion is streamed; the text so far is published as output.partial
+    every SUMMARY_PARTIAL_INTERVAL seconds while it generates.
     """
-    async def execute(self, data: dict, context: dict, db: AsyncSession) -> dict:
-        from openai import AsyncOpenAI
-        from app.config import get_settings
+    streams_partial_output = True
 
+    async def execute(
+        self, data: dict, context: dict, db: AsyncSession, publish: Callable[[dict], None] | None = None
+    ) -> dict:
         api_key = data.get("api_key", "").strip()
         if not api_key:
             settings = get_settings()
@@ -120,49 +216,48 @@ class SummarizeNodeHandler(BaseNodeHandler):
         if not api_key:
             raise ValueError("OpenAI API key is required. Set it in the Summarize node config.")
 
-        client = AsyncOpenAI(api_key=api_key)
+        client = _openai_client(api_key)
         model = data.get("model", "gpt-4o")
         temperature = float(data.get("temperature", 0.3))
         email_content = str(data.get("email_content", ""))
 
-        system_prompt = data.get("system_prompt") or (
-            "You are an expert email analyst. Given an email (subject, body, and any attachments), "
-            "produce a clean, structured summary with the following sections:\n"
-            "1. **Summary** – 2-3 sentence overview\n"
-            "2. **Key Points** – bullet list of important information\n"
-            "3. **Action Items** – any tasks or follow-ups required\n"
-            "4. **Sentiment** – overall tone (positive / neutral / negative)\n"
-            "5. **Category** – classify as: support / sales / invoice / hr / general\n"
-            "Be concise and professional."
-        )
+        # The default prompt asks for a JSON object so the fields can be read
+        # directly; a custom prompt gets freeform text parsed by section headings.
+        custom_prompt = data.get("system_prompt")
+        system_prompt = custom_prompt or _DEFAULT_SUMMARY_PROMPT
+        request_kwargs = {} if custom_prompt else {"response_format": {"type": "json_object"}}
 
-        response = await client.chat.completions.create(
+        stream = await client.chat.completions.create(
             model=model,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": f"Analyse this email:\n\n{email_content}"},
             ],
             temperature=temperature,
+            stream=True,
+            # Usage arrives on a final chunk with no choices
+            stream_options={"include_usage": True},
+            **request_kwargs,
         )
 
-        choice = response.choices[0]
-        usage = response.usage
-        summary_text = choice.message.content or ""
-
-        # Parse structured fields from the summary
-        def extract_section(text: str, heading: str) -> str:
-            pattern = rf"(?:#+\s*|\*\*)?{re.escape(heading)}[:\*]*\*?\s*([\s\S]*?)(?=\n(?:#+|\d+\.|\*\*)|$)"
-            m = re.search(pattern, text, re.IGNORECASE)
-            return m.group(1).strip() if m else ""
+        parts: list[str] = []
+        usage = None
+        last_published = time.monotonic()
+        async for chunk in stream:
+            if chunk.usage:
+                usage = chunk.usage
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            parts.append(chunk.choices[0].delta.content)
+            if publish is not None and time.monotonic() - last_published >= SUMMARY_PARTIAL_INTERVAL:
+                publish({"partial": "".join(parts), "model": model})
+                last_published = time.monotonic()
+        summary_text = "".join(parts)
 
         return {
             "output": {
                 "summary": summary_text,
-                "overview": extract_section(summary_text, "Summary"),
-                "key_points": extract_section(summary_text, "Key Points"),
-                "action_items": extract_section(summary_text, "Action Items"),
-                "sentiment": extract_section(summary_text, "Sentiment"),
-                "category": extract_section(summary_text, "Category"),
+                **_parse_summary(summary_text),
                 "model": model,
             },
             "token_usage": {
@@ -173,6 +268,74 @@ class SummarizeNodeHandler(BaseNodeHandler):
         }
 
 
+_DEFAULT_SUMMARY_PROMPT = (
+    "You are an expert email analyst. Given an email (subject, body, and any attachments), "
+    "produce a clean, structured summary. Respond with a JSON object with keys:\n"
+    '- "overview": 2-3 sentence overview\n'
+    '- "key_points": list of important information\n'
+    '- "action_items": list of any tasks or follow-ups required\n'
+    '- "sentiment": overall tone (positive / neutral / negative)\n'
+    '- "category": one of support / sales / invoice / hr / general\n'
+    "Be concise and professional."
+)
+
+_SUMMARY_FIELDS = {
+    "overview": "Summary",
+    "key_points": "Key Points",
+    "action_items": "Action Items",
+    "sentiment": "Sentiment",
+    "category": "Category",
+}
+
+
+# One alternation over every heading, so freeform text is scanned once for all sections
+_SECTIONS_RE = re.compile(
+    r"(?:#+\s*|\*\*)?(?P<heading>" + "|".join(map(re.escape, _SUMMARY_FIELDS.values())) + r")[:\*]*\*?\s*"
+    r"(?P<body>[\s\S]*?)(?=\n(?:#+|\d+\.|\*\*)|$)",
+    re.IGNORECASE,
+)
+_HEADING_TO_FIELD = {heading.lower(): key for key, heading in _SUMMARY_FIELDS.items()}
+
+
+def _extract_sections(text: str) -> dict[str, str]:
+    """Parse the structured sections (e.g. "Key Points") out of freeform summary text."""
+    fields = dict.fromkeys(_SUMMARY_FIELDS, "")
+    for m in _SECTIONS_RE.finditer(text):
+        key = _HEADING_TO_FIELD[m.group("heading").lower()]
+        if not fields[key]:
+            fields[key] = m.group("body").strip()
+    return fields
+
+
+def _parse_summary(summary_text: str) -> dict[str, str]:
+    """
+    Read the summary fields from a JSON response, falling back to section
+    headings for freeform text. List values are rendered as "- item" lines so
+    every field stays a string for downstream nodes (e.g. Sheets columns).
+    """
+    try:
+        parsed = json.loads(summary_text)
+    except ValueError:
+        parsed = None
+
+    if not isinstance(parsed, dict):
+        return _extract_sections(summary_text)
+
+    fields = {}
+    for key in _SUMMARY_FIELDS:
+        value = parsed.get(key) or ""
+        if isinstance(value, list):
+            value = "\n".join(f"- {item}" for item in value)
+        fields[key] = str(value).strip()
+    return fields
+
+
+@lru_cache(maxsize=8)
+def _openai_client(api_key: str) -> AsyncOpenAI:
+    """One client per API key, so its pooled keep-alive connections are reused across runs."""
+    return AsyncOpenAI(api_key=api_key)
+
+
 # ─── Google Sheets ────────────────────────────────────────────────────────────
 class GoogleSheetsNodeHandler(BaseNodeHandler):
     """
@@ -180,9 +343,12 @@ class GoogleSheetsNodeHandler(BaseNodeHandler):
     Auth priority:
       1. service_account_json  → uses google-api-python-client (most reliable)
       2. bearer_token          → direct OAuth2 bearer token
+    With batch_mode enabled the row is queued and appended together with other
+    queued rows for the same sheet (output status "queued"). A deferred append
+    that fails is re-queued and retried up to SHEETS_BATCH_RETRIES times; rows
+    that still fail, or fail in the shutdown flush, are logged and dropped.
     """
     async def execute(self, data: dict, context: dict, db: AsyncSession) -> dict:
-        import asyncio
         spreadsheet_id = data.get("spreadsheet_id", "").strip()
         sheet_name = data.get("sheet_name", "Sheet1").strip() or "Sheet1"
         bearer_token = data.get("bearer_token", "").strip()
@@ -214,66 +380,172 @@ class GoogleSheetsNodeHandler(BaseNodeHandler):
                 "Google Sheets: provide either a service_account_json or bearer_token in the node config."
             )
 
-        # Use google-api-python-client with service account (preferred)
-        if service_account_json:
-            result = await asyncio.get_event_loop().run_in_executor(
-                None,
-                _append_with_service_account,
-                service_account_json,
-                spreadsheet_id,
-                sheet_name,
-                values,
-            )
-            return result
-
-        # Fallback: raw bearer token via httpx
-        url = (
-            f"https://sheets.googleapis.com/v4/spreadsheets/{spreadsheet_id}"
-            f"/values/{sheet_name}!A1:append?valueInputOption=USER_ENTERED&insertDataOption=INSERT_ROWS"
-        )
-        headers = {
-            "Authorization": f"Bearer {bearer_token}",
-            "Content-Type": "application/json",
-        }
-        body = {"values": [values]}
-
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(url, headers=headers, json=body)
-
-        try:
-            resp_data = response.json()
-        except Exception:
-            resp_data = {"raw": response.text}
-
-        if response.status_code not in (200, 201):
-            raise ValueError(f"Google Sheets API error {response.status_code}: {resp_data}")
+        # Batch mode: queue the row and let the buffer append many rows per API call
+        if data.get("batch_mode"):
+            key = (spreadsheet_id, sheet_name, service_account_json, bearer_token)
+            queued = await _enqueue_sheets_row(key, values)
+            return {
+                "output": {
+                    "status": "queued",
+                    "spreadsheet_id": spreadsheet_id,
+                    "sheet_name": sheet_name,
+                    "row_values": values,
+                    "queued_rows": queued,
+                }
+            }
 
+        updates = await _append_sheets_rows(spreadsheet_id, sheet_name, service_account_json, bearer_token, [values])
         return {
             "output": {
                 "status": "appended",
                 "spreadsheet_id": spreadsheet_id,
                 "sheet_name": sheet_name,
                 "row_values": values,
-                "updated_range": resp_data.get("updates", {}).get("updatedRange", ""),
-                "updated_rows": resp_data.get("updates", {}).get("updatedRows", 1),
+                "updated_range": updates.get("updatedRange", ""),
+                "updated_rows": updates.get("updatedRows", 1),
             }
         }
 
 
-def _append_with_service_account(
-    service_account_json: str,
+async def _append_sheets_rows(
     spreadsheet_id: str,
     sheet_name: str,
-    values: list,
+    service_account_json: str,
+    bearer_token: str,
+    rows: list[list],
 ) -> dict:
-    """Synchronous helper — runs in executor. Uses google-api-python-client."""
-    import json as _json
-    import tempfile
-    import os
+    """Append rows in a single API call and return the response's "updates" block."""
+    # Use google-api-python-client with service account (preferred)
+    if service_account_json:
+        return await asyncio.get_running_loop().run_in_executor(
+            _SHEETS_EXECUTOR,
+            _append_with_service_account,
+            service_account_json,
+            spreadsheet_id,
+            sheet_name,
+            rows,
+        )
+
+    # Fallback: raw bearer token via httpx
+    url = (
+        f"https://sheets.googleapis.com/v4/spreadsheets/{spreadsheet_id}"
+        f"/values/{sheet_name}!A1:append?valueInputOption=USER_ENTERED&insertDataOption=INSERT_ROWS"
+    )
+    headers = {
+        "Authorization": f"Bearer {bearer_token}",
+        "Content-Type": "application/json",
+    }
+    body = {"values": rows}
+
+    client = await _get_httpx_client()
+    response = await client.post(url, headers=headers, json=body)
+
+    try:
+        resp_data = response.json()
+    except Exception:
+        resp_data = {"raw": response.text}
+
+    if response.status_code not in (200, 201):
+        raise ValueError(f"Google Sheets API error {response.status_code}: {resp_data}")
+
+    return resp_data.get("updates", {})
+
+
+# Batch mode buffers rows per (spreadsheet_id, sheet_name, service_account_json,
+# bearer_token) and appends them together once SHEETS_BATCH_SIZE rows are queued
+# or SHEETS_BATCH_DELAY seconds after the first queued row, whichever is first.
+SHEETS_BATCH_SIZE = 50
+SHEETS_BATCH_DELAY = 2.0
+SHEETS_BATCH_RETRIES = 3
+_sheets_buffer: dict[tuple[str, str, str, str], list[list]] = {}
+_sheets_flush_tasks: dict[tuple[str, str, str, str], asyncio.Task] = {}
+_sheets_flush_failures: dict[tuple[str, str, str, str], int] = {}
+_sheets_buffer_lock = asyncio.Lock()
+
+
+async def _enqueue_sheets_row(key: tuple[str, str, str, str], values: list) -> int:
+    """Queue a row for batched append; returns the number of rows now queued for key."""
+    batch = None
+    async with _sheets_buffer_lock:
+        rows = _sheets_buffer.setdefault(key, [])
+        rows.append(values)
+        queued = len(rows)
+        if queued >= SHEETS_BATCH_SIZE:
+            batch = _sheets_buffer.pop(key)
+            timer = _sheets_flush_tasks.pop(key, None)
+            if timer is not None:
+                timer.cancel()
+        elif key not in _sheets_flush_tasks:
+            _sheets_flush_tasks[key] = asyncio.create_task(_flush_sheets_later(key))
+
+    if batch:
+        # Every row in the batch was reported "queued", so a failure goes
+        # through the retry path instead of failing only this caller's node
+        await _append_sheets_batch(key, batch)
+    return queued
+
+
+async def _flush_sheets_later(key: tuple[str, str, str, str]) -> None:
+    await asyncio.sleep(SHEETS_BATCH_DELAY)
+    async with _sheets_buffer_lock:
+        _sheets_flush_tasks.pop(key, None)
+        batch = _sheets_buffer.pop(key, None)
+    if batch:
+        await _append_sheets_batch(key, batch)
+
+
+async def _append_sheets_batch(key: tuple[str, str, str, str], batch: list[list]) -> None:
+    """Append a queued batch; on failure re-queue it for a delayed retry, never raise."""
+    try:
+        await _append_sheets_rows(*key, batch)
+    except Exception:
+        async with _sheets_buffer_lock:
+            failures = _sheets_flush_failures.get(key, 0) + 1
+            if failures > SHEETS_BATCH_RETRIES:
+                _sheets_flush_failures.pop(key, None)
+                logger.exception(
+                    "Google Sheets batch append failed for %s/%s; dropping %d rows after %d attempts",
+                    key[0], key[1], len(batch), failures,
+                )
+                return
+            _sheets_flush_failures[key] = failures
+            # Put the failed rows back ahead of anything queued meanwhile
+            _sheets_buffer[key] = batch + _sheets_buffer.get(key, [])
+            if key not in _sheets_flush_tasks:
+                _sheets_flush_tasks[key] = asyncio.create_task(_flush_sheets_later(key))
+        logger.exception(
+            "Google Sheets batch append failed for %s/%s; re-queued %d rows (attempt %d of %d)",
+            key[0], key[1], len(batch), failures, SHEETS_BATCH_RETRIES + 1,
+        )
+    else:
+        _sheets_flush_failures.pop(key, None)
+
+
+async def flush_sheets_buffers() -> None:
+    """Append every queued batch-mode row now (called on application shutdown)."""
+    async with _sheets_buffer_lock:
+        for timer in _sheets_flush_tasks.values():
+            timer.cancel()
+        _sheets_flush_tasks.clear()
+        pending = list(_sheets_buffer.items())
+        _sheets_buffer.clear()
+        _sheets_flush_failures.clear()
+    for key, batch in pending:
+        try:
+            await _append_sheets_rows(*key, batch)
+        except Exception:
+            # No later flush to retry in; the rows are lost
+            logger.exception(
+                "Google Sheets batch append failed for %s/%s on shutdown; dropping %d rows",
+                key[0], key[1], len(batch),
+            )
 
+
+@lru_cache(maxsize=32)
+def _get_sheets_credentials(service_account_json: str):
+    """Parse the service account JSON and build Sheets-scoped credentials once per key."""
     try:
         from google.oauth2 import service_account
-        from googleapiclient.discovery import build
     except ImportError:
         raise ImportError(
             "google-api-python-client is required. Run: pip install google-api-python-client google-auth"
@@ -281,19 +553,53 @@ def _append_with_service_account(
 
     # Parse and validate JSON
     try:
-        sa_info = _json.loads(service_account_json)
+        sa_info = json.loads(service_account_json)
     except Exception:
         raise ValueError("service_account_json is not valid JSON.")
 
     # Build credentials from dict
-    creds = service_account.Credentials.from_service_account_info(
+    return service_account.Credentials.from_service_account_info(
         sa_info,
         scopes=["https://www.googleapis.com/auth/spreadsheets"],
     )
 
-    service = build("sheets", "v4", credentials=creds, cache_discovery=False)
 
-    body = {"values": [values]}
+def _get_sheets_service(service_account_json: str):
+    """
+    Return a Sheets API resource for this service account, built once per worker
+    thread. The underlying httplib2 transport is not thread-safe, so services are
+    cached per thread rather than shared across the pool.
+    """
+    try:
+        from googleapiclient.discovery import build
+    except ImportError:
+        raise ImportError(
+            "google-api-python-client is required. Run: pip install google-api-python-client google-auth"
+        )
+
+    services = getattr(_sheets_local, "services", None)
+    if services is None:
+        services = _sheets_local.services = {}
+
+    key = hashlib.sha256(service_account_json.encode()).hexdigest()
+    service = services.get(key)
+    if service is None:
+        creds = _get_sheets_credentials(service_account_json)
+        service = build("sheets", "v4", credentials=creds, cache_discovery=False, static_discovery=True)
+        services[key] = service
+    return service
+
+
+def _append_with_service_account(
+    service_account_json: str,
+    spreadsheet_id: str,
+    sheet_name: str,
+    rows: list[list],
+) -> dict:
+    """Synchronous helper — runs in _SHEETS_EXECUTOR. Uses google-api-python-client."""
+    service = _get_sheets_service(service_account_json)
+
+    body = {"values": rows}
     result = (
         service.spreadsheets()
         .values()
@@ -307,17 +613,7 @@ def _append_with_service_account(
         .execute()
     )
 
-    updates = result.get("updates", {})
-    return {
-        "output": {
-            "status": "appended",
-            "spreadsheet_id": spreadsheet_id,
-            "sheet_name": sheet_name,
-            "row_values": values,
-            "updated_range": updates.get("updatedRange", ""),
-            "updated_rows": updates.get("updatedRows", 1),
-        }
-    }
+    return result.get("updates", {})
 
 
 # ─── Response Node ────────────────────────────────────────────────────────────
@@ -334,17 +630,18 @@ class ResponseNodeHandler(BaseNodeHandler):
 
 
 # ─── Handler Registry ─────────────────────────────────────────────────────────
-_HANDLERS: dict[str, type[BaseNodeHandler]] = {
-    "email_trigger": EmailTriggerNodeHandler,
-    "extract_content": ExtractContentNodeHandler,
-    "summarize": SummarizeNodeHandler,
-    "google_sheets": GoogleSheetsNodeHandler,
-    "response": ResponseNodeHandler,
+# Handlers are stateless, so one shared instance per node type is enough.
+_HANDLERS: dict[str, BaseNodeHandler] = {
+    "email_trigger": EmailTriggerNodeHandler(),
+    "extract_content": ExtractContentNodeHandler(),
+    "summarize": SummarizeNodeHandler(),
+    "google_sheets": GoogleSheetsNodeHandler(),
+    "response": ResponseNodeHandler(),
 }
 
 
 def get_node_handler(node_type: str, custom_definition: dict | None = None) -> BaseNodeHandler:
-    handler_class = _HANDLERS.get(node_type)
-    if not handler_class:
+    handler = _HANDLERS.get(node_type)
+    if handler is None:
         raise ValueError(f"Unknown node type: '{node_type}'. Supported: {list(_HANDLERS.keys())}")
-    return handler_class()
+    return handler
@@ -1,8 +1,9 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from app.config import get_settings
-from app.database import init_db, get_db
+from app.database import init_db, async_session, pool_status
 from app.routes import auth, workflows, runs, webhooks, integrations, gmail
 
 settings = get_settings()
@@ -15,9 +16,7 @@ async def lifespan(app: FastAPI):
     # Start Gmail poller in background
     try:
         from app.services.gmail_poller import start_gmail_poller
-        async for db in get_db():
-            await start_gmail_poller(db)
-            break
+        await start_gmail_poller(async_session)
     except Exception as e:
         print(f"Failed to start Gmail poller: {e}")
     
@@ -30,12 +29,22 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"Failed to stop Gmail poller: {e}")
 
+    # Flush batched Sheets rows, then close the shared HTTP client used by node handlers
+    try:
+        from app.engine.node_handlers import flush_sheets_buffers, close_http_client
+        await flush_sheets_buffers()
+        await close_http_client()
+    except Exception as e:
+        print(f"Failed to close HTTP client: {e}")
+
 
 app = FastAPI(
     title="AgentKit API",
     description="OpenAI Agent Builder + n8n Hybrid with Custom Node Engine",
     version="1.0.0",
     lifespan=lifespan,
+    # orjson encodes the large node input/output payloads in run responses far faster than stdlib json
+    default_response_class=ORJSONResponse,
 )
 
 # Allow all origins in dev mode, specific origins in production
@@ -66,4 +75,4 @@ app.include_router(gmail.router, prefix="/api")
 
 @app.get("/api/health")
 async def health():
-    return {"status": "ok", "service": "agentkit"}
+    return {"status": "ok", "service": "agentkit", "db_pool": pool_status()}
@@ -1,6 +1,6 @@
 from app.models.user import User
 from app.models.agent import Agent
-from app.models.workflow import Workflow, WorkflowNode, WorkflowEdge
+from app.models.workflow import Workflow, WorkflowNode, WorkflowEdge, WorkflowTrigger
 from app.models.run import WorkflowRun, NodeRun
 from app.models.custom_node import CustomNode
 from app.models.integration import Integration
@@ -11,6 +11,7 @@ __all__ = [
     "Workflow",
     "WorkflowNode",
     "WorkflowEdge",
+    "WorkflowTrigger",
     "WorkflowRun",
     "NodeRun",
     "CustomNode",
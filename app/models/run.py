@@ -1,35 +1,48 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import String, DateTime, Text, Float, Integer, ForeignKey, Enum as SAEnum
+from sqlalchemy import String, DateTime, Text, Float, Integer, ForeignKey, Enum as SAEnum, Index, text, CheckConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID, JSONB
-from app.database import Base
+from app.database import Base, utcnow_sql
+from app.utils.ids import uuid7
 
 
 class WorkflowRun(Base):
     __tablename__ = "workflow_runs"
+    __table_args__ = (
+        # Trigger payloads are capped at 1 MiB on disk
+        CheckConstraint("pg_column_size(input_payload) < 1048576", name="ck_workflow_runs_input_payload_size"),
+    )
 
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     workflow_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("workflows.id"), nullable=False)
+    # Copy of workflows.user_id so ownership checks don't need the join
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     status: Mapped[str] = mapped_column(
         SAEnum("pending", "running", "completed", "failed", "cancelled", name="run_status"),
         default="pending",
     )
-    trigger_type: Mapped[str] = mapped_column(String(50), default="manual")
+    trigger_type: Mapped[str] = mapped_column(
+        SAEnum("manual", "webhook", "gmail", "schedule", "api", name="trigger_type"),
+        default="manual",
+    )
     input_payload: Mapped[dict] = mapped_column(JSONB, default=dict)
     output_payload: Mapped[dict] = mapped_column(JSONB, default=dict)
     error: Mapped[str | None] = mapped_column(Text, nullable=True)
-    started_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
-    completed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=utcnow_sql())
+    completed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
     workflow = relationship("Workflow", back_populates="runs")
-    node_runs = relationship("NodeRun", back_populates="run", cascade="all, delete-orphan", lazy="selectin")
+    # Opt in with selectinload(WorkflowRun.node_runs) where the response needs them
+    node_runs = relationship(
+        "NodeRun", back_populates="run", cascade="all, delete-orphan", lazy="raise", passive_deletes=True
+    )
 
 
 class NodeRun(Base):
     __tablename__ = "node_runs"
 
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     run_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("workflow_runs.id", ondelete="CASCADE"), nullable=False)
     node_id: Mapped[str] = mapped_column(String(255), nullable=False)
     node_key: Mapped[str | None] = mapped_column(String(255), nullable=True)
@@ -42,7 +55,28 @@ class NodeRun(Base):
     error: Mapped[str | None] = mapped_column(Text, nullable=True)
     execution_time_ms: Mapped[float] = mapped_column(Float, default=0.0)
     token_usage: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
-    started_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
-    completed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=utcnow_sql())
+    completed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
     run = relationship("WorkflowRun", back_populates="node_runs")
+
+
+Index("ix_runs_workflow_started", WorkflowRun.workflow_id, WorkflowRun.started_at.desc())
+Index("ix_runs_user_started", WorkflowRun.user_id, WorkflowRun.started_at.desc())
+Index("ix_node_runs_run_id", NodeRun.run_id)
+# Runs are appended in time order, so a BRIN index covers time-range scans in
+# a few pages
+Index("brin_runs_started", WorkflowRun.started_at, postgresql_using="brin")
+# jsonb_path_ops only serves @> containment, but is far smaller than the default GIN opclass
+Index(
+    "gin_runs_input",
+    WorkflowRun.input_payload,
+    postgresql_using="gin",
+    postgresql_ops={"input_payload": "jsonb_path_ops"},
+)
+Index(
+    "ix_runs_active",
+    WorkflowRun.workflow_id,
+    WorkflowRun.started_at,
+    postgresql_where=text("status IN ('pending', 'running')"),
+)
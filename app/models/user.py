@@ -1,18 +1,24 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import String, DateTime, Enum as SAEnum
+from sqlalchemy import String, DateTime, Enum as SAEnum, FetchedValue
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import UUID
-from app.database import Base
+from app.database import Base, utcnow_sql, updated_at_trigger
+from app.utils.ids import uuid7
 
 
 class User(Base):
     __tablename__ = "users"
+    # Fetch server-generated timestamps via RETURNING instead of expiring them
+    __mapper_args__ = {"eager_defaults": True}
 
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     email: Mapped[str] = mapped_column(String(255), unique=True, nullable=False, index=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     hashed_password: Mapped[str] = mapped_column(String(512), nullable=False)
     role: Mapped[str] = mapped_column(SAEnum("admin", "editor", "viewer", name="user_role"), default="editor")
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
-    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=utcnow_sql())
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=utcnow_sql(), server_onupdate=FetchedValue())
+
+
+updated_at_trigger(User.__table__)
@@ -1,15 +1,24 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import String, DateTime, Text, ForeignKey, Enum as SAEnum
+from sqlalchemy import String, DateTime, Text, ForeignKey, Enum as SAEnum, Index, text, FetchedValue, CheckConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID, JSONB
-from app.database import Base
+from app.database import Base, utcnow_sql, updated_at_trigger
+from app.utils.ids import uuid7
 
 
 class Workflow(Base):
     __tablename__ = "workflows"
+    __table_args__ = (
+        # Leading user_id also serves the plain per-user listing
+        Index("ix_workflows_user_status", "user_id", "status"),
+        # Webhook lookups only ever match published workflows
+        Index("ix_workflows_published", "id", postgresql_where=text("status = 'published'")),
+    )
+    # Fetch server-generated timestamps via RETURNING instead of expiring them
+    __mapper_args__ = {"eager_defaults": True}
 
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     agent_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("agents.id"), nullable=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -17,19 +26,27 @@ class Workflow(Base):
     status: Mapped[str] = mapped_column(SAEnum("draft", "published", name="workflow_status"), default="draft")
     variables: Mapped[dict] = mapped_column(JSONB, default=dict)
     metadata_: Mapped[dict] = mapped_column("metadata", JSONB, default=dict)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
-    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Execution order and node_key -> [child node_key] map, computed on save
+    sorted_nodes: Mapped[list] = mapped_column(JSONB, default=list)
+    adjacency: Mapped[dict] = mapped_column(JSONB, default=dict)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=utcnow_sql())
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=utcnow_sql(), server_onupdate=FetchedValue())
 
-    agent = relationship("Agent", back_populates="workflows", lazy="selectin")
+    agent = relationship("Agent", back_populates="workflows", lazy="raise")
     nodes = relationship("WorkflowNode", back_populates="workflow", cascade="all, delete-orphan", lazy="selectin")
     edges = relationship("WorkflowEdge", back_populates="workflow", cascade="all, delete-orphan", lazy="selectin")
-    runs = relationship("WorkflowRun", back_populates="workflow", lazy="selectin")
+    # agent and runs are never loaded implicitly; opt in per query
+    runs = relationship("WorkflowRun", back_populates="workflow", lazy="raise", passive_deletes=True)
+
+
+updated_at_trigger(Workflow.__table__)
 
 
 class WorkflowNode(Base):
     __tablename__ = "workflow_nodes"
+    __table_args__ = (CheckConstraint("length(node_key) <= 64", name="ck_workflow_nodes_node_key_len"),)
 
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     workflow_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("workflows.id", ondelete="CASCADE"), nullable=False)
     node_key: Mapped[str] = mapped_column(String(255), nullable=False, default="")
     type: Mapped[str] = mapped_column(String(50), nullable=False)
@@ -44,7 +61,7 @@ class WorkflowNode(Base):
 class WorkflowEdge(Base):
     __tablename__ = "workflow_edges"
 
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     workflow_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("workflows.id", ondelete="CASCADE"), nullable=False)
     source: Mapped[str] = mapped_column(String(255), nullable=False)
     target: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -53,3 +70,13 @@ class WorkflowEdge(Base):
     condition: Mapped[str | None] = mapped_column(Text, nullable=True)
 
     workflow = relationship("Workflow", back_populates="edges")
+
+
+class WorkflowTrigger(Base):
+    """Integration a workflow's trigger node listens on, derived from node data on save."""
+    __tablename__ = "workflow_triggers"
+    __table_args__ = (Index("ix_workflow_triggers_integration_type", "integration_id", "type"),)
+
+    workflow_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("workflows.id", ondelete="CASCADE"), primary_key=True)
+    integration_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    type: Mapped[str] = mapped_column(String(50), primary_key=True)
@@ -1,7 +1,7 @@
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from app.database import get_db
 from app.models.agent import Agent
 from app.models.user import User
@@ -10,6 +10,9 @@ from app.utils.auth import get_current_user_optional
 
 router = APIRouter(prefix="/agents", tags=["agents"])
 
+# Columns backing AgentResponse, for list queries that skip ORM hydration
+_RESPONSE_COLUMNS = tuple(Agent.__table__.c[name] for name in AgentResponse.model_fields)
+
 
 @router.post("", response_model=AgentResponse)
 async def create_agent(
@@ -36,8 +39,9 @@ async def list_agents(
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user_optional),
 ):
-    result = await db.execute(select(Agent).where(Agent.user_id == user.id))
-    return [AgentResponse.model_validate(a) for a in result.scalars().all()]
+    result = await db.execute(select(*_RESPONSE_COLUMNS).where(Agent.user_id == user.id))
+    # Rows were validated on write; construct without re-validating
+    return [AgentResponse.model_construct(**row) for row in result.mappings()]
 
 
 @router.get("/{agent_id}", response_model=AgentResponse)
@@ -60,16 +64,21 @@ async def update_agent(
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user_optional),
 ):
-    result = await db.execute(select(Agent).where(Agent.id == agent_id, Agent.user_id == user.id))
+    update_data = payload.model_dump(exclude_unset=True)
+    if update_data:
+        # Single statement both authorizes (user_id) and mutates
+        stmt = (
+            update(Agent)
+            .where(Agent.id == agent_id, Agent.user_id == user.id)
+            .values(**update_data)
+            .returning(Agent)
+        )
+    else:
+        stmt = select(Agent).where(Agent.id == agent_id, Agent.user_id == user.id)
+    result = await db.execute(stmt)
     agent = result.scalar_one_or_none()
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
-
-    update_data = payload.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(agent, key, value)
-
-    await db.flush()
     return AgentResponse.model_validate(agent)
 
 
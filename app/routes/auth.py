@@ -1,27 +1,32 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 from app.database import get_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserLogin, UserResponse, TokenResponse
-from app.utils.auth import hash_password, verify_password, create_access_token, get_current_user
+from app.utils.auth import hash_password, verify_password, create_access_token, get_current_user, invalidate_cached_user
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 @router.post("/register", response_model=TokenResponse)
 async def register(payload: UserCreate, db: AsyncSession = Depends(get_db)):
-    existing = await db.execute(select(User).where(User.email == payload.email))
-    if existing.scalar_one_or_none():
-        raise HTTPException(status_code=400, detail="Email already registered")
-
-    user = User(
-        email=payload.email,
-        name=payload.name,
-        hashed_password=hash_password(payload.password),
+    # bcrypt is deliberately slow; keep it off the event loop
+    hashed_password = await asyncio.to_thread(hash_password, payload.password)
+
+    # One statement; the unique email constraint decides, so concurrent
+    # signups for the same address can't both get through
+    stmt = (
+        insert(User)
+        .values(email=payload.email, name=payload.name, hashed_password=hashed_password)
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User)
     )
-    db.add(user)
-    await db.flush()
+    user = (await db.execute(stmt)).scalar_one_or_none()
+    if user is None:
+        raise HTTPException(status_code=400, detail="Email already registered")
 
     token = create_access_token(str(user.id))
     return TokenResponse(
@@ -34,9 +39,11 @@ async def register(payload: UserCreate, db: AsyncSession = Depends(get_db)):
 async def login(payload: UserLogin, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.email == payload.email))
     user = result.scalar_one_or_none()
-    if not user or not verify_password(payload.password, user.hashed_password):
+    if not user or not await asyncio.to_thread(verify_password, payload.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # A fresh login shouldn't be served a snapshot from before a role change
+    invalidate_cached_user(user.id)
     token = create_access_token(str(user.id))
     return TokenResponse(
         access_token=token,
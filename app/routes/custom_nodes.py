@@ -1,15 +1,22 @@
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from app.database import get_db
 from app.models.custom_node import CustomNode
 from app.models.user import User
-from app.schemas.custom_node import CustomNodeCreate, CustomNodeUpdate, CustomNodeResponse
+from app.schemas.custom_node import CustomNodeCreate, CustomNodeUpdate, CustomNodeResponse, CustomNodeFieldSchema
 from app.utils.auth import get_current_user_optional
 
 router = APIRouter(prefix="/custom-nodes", tags=["custom-nodes"])
 
+# Columns backing CustomNodeResponse, for list queries that skip ORM hydration
+_RESPONSE_COLUMNS = tuple(CustomNode.__table__.c[name] for name in CustomNodeResponse.model_fields)
+
+# Dumps the whole input_fields list in one call into pydantic-core
+_fields_adapter = TypeAdapter(list[CustomNodeFieldSchema])
+
 
 @router.post("", response_model=CustomNodeResponse)
 async def create_custom_node(
@@ -23,7 +30,7 @@ async def create_custom_node(
         icon=payload.icon,
         category=payload.category,
         color=payload.color,
-        input_fields=[f.model_dump() for f in payload.input_fields],
+        input_fields=_fields_adapter.dump_python(payload.input_fields),
         output_schema=payload.output_schema,
         api_endpoint=payload.api_endpoint,
         http_method=payload.http_method,
@@ -43,8 +50,9 @@ async def list_custom_nodes(
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user_optional),
 ):
-    result = await db.execute(select(CustomNode).where(CustomNode.user_id == user.id))
-    return [CustomNodeResponse.model_validate(n) for n in result.scalars().all()]
+    result = await db.execute(select(*_RESPONSE_COLUMNS).where(CustomNode.user_id == user.id))
+    # Rows were validated on write; construct without re-validating
+    return [CustomNodeResponse.model_construct(**row) for row in result.mappings()]
 
 
 @router.get("/{node_id}", response_model=CustomNodeResponse)
@@ -67,19 +75,24 @@ async def update_custom_node(
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user_optional),
 ):
-    result = await db.execute(select(CustomNode).where(CustomNode.id == node_id, CustomNode.user_id == user.id))
+    update_data = payload.model_dump(exclude_unset=True, exclude={"input_fields"})
+    if payload.input_fields is not None:
+        update_data["input_fields"] = _fields_adapter.dump_python(payload.input_fields)
+
+    if update_data:
+        # Single statement both authorizes (user_id) and mutates
+        stmt = (
+            update(CustomNode)
+            .where(CustomNode.id == node_id, CustomNode.user_id == user.id)
+            .values(**update_data)
+            .returning(CustomNode)
+        )
+    else:
+        stmt = select(CustomNode).where(CustomNode.id == node_id, CustomNode.user_id == user.id)
+    result = await db.execute(stmt)
     node = result.scalar_one_or_none()
     if not node:
         raise HTTPException(status_code=404, detail="Custom node not found")
-
-    update_data = payload.model_dump(exclude_unset=True)
-    if "input_fields" in update_data and update_data["input_fields"] is not None:
-        update_data["input_fields"] = [f.model_dump() if hasattr(f, "model_dump") else f for f in update_data["input_fields"]]
-
-    for key, value in update_data.items():
-        setattr(node, key, value)
-
-    await db.flush()
     return CustomNodeResponse.model_validate(node)
 
 
@@ -11,7 +11,7 @@ from app.models.integration import Integration
 from app.models.user import User
 from app.schemas.integration import IntegrationCreate, IntegrationResponse
 from app.utils.auth import get_current_user_optional
-from app.utils.encryption import encrypt_credentials, decrypt_credentials
+from app.utils.encryption import encrypt_credentials, decrypt_credentials_cached, invalidate_cached_credentials
 from app.services.gmail_service import GmailService
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
@@ -103,14 +103,15 @@ async def test_gmail_integration(
         raise HTTPException(status_code=404, detail="Gmail integration not found")
     
     try:
-        credentials = decrypt_credentials(integration.credentials_encrypted)
-        gmail_service = GmailService(credentials)
+        credentials = decrypt_credentials_cached(integration.id, integration.credentials_encrypted)
+        gmail_service = GmailService(credentials, include_raw_headers=True)
         
         messages = gmail_service.get_unread_messages(max_results=5)
         
         updated_creds = gmail_service.get_updated_credentials()
         if updated_creds.get("access_token") != credentials.get("access_token"):
             integration.credentials_encrypted = encrypt_credentials(updated_creds)
+            invalidate_cached_credentials(integration.id)
             await db.flush()
         
         return GmailTestResponse(
@@ -145,9 +146,10 @@ async def poll_gmail_now(
     
     try:
         from app.services.gmail_poller import GmailPoller
+        from app.database import async_session
         
-        poller = GmailPoller(db)
-        await poller._poll_integration(integration)
+        poller = GmailPoller(async_session)
+        await poller._poll_integration(integration, db)
         
         return {"status": "success", "message": "Gmail polling triggered successfully"}
         
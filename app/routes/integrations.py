@@ -1,16 +1,27 @@
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, func, literal_column
 from app.database import get_db
 from app.models.integration import Integration
 from app.models.user import User
 from app.schemas.integration import IntegrationCreate, IntegrationUpdate, IntegrationResponse
 from app.utils.auth import get_current_user_optional
-from app.utils.encryption import encrypt_credentials, decrypt_credentials
+from app.utils.encryption import encrypt_credentials, decrypt_credentials, invalidate_cached_credentials
 
 router = APIRouter(prefix="/integrations", tags=["integrations"])
 
+# Columns backing IntegrationResponse, for list queries that skip ORM hydration.
+# Never includes credentials_encrypted.
+_RESPONSE_COLUMNS = (
+    Integration.id,
+    Integration.name,
+    Integration.type,
+    func.coalesce(Integration.metadata_, literal_column("'{}'::jsonb")).label("metadata"),
+    Integration.created_at,
+    Integration.updated_at,
+)
+
 
 @router.post("", response_model=IntegrationResponse)
 async def create_integration(
@@ -35,8 +46,9 @@ async def list_integrations(
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user_optional),
 ):
-    result = await db.execute(select(Integration).where(Integration.user_id == user.id))
-    return [IntegrationResponse.model_validate(i) for i in result.scalars().all()]
+    result = await db.execute(select(*_RESPONSE_COLUMNS).where(Integration.user_id == user.id))
+    # Rows were validated on write; construct without re-validating
+    return [IntegrationResponse.model_construct(**row) for row in result.mappings()]
 
 
 @router.get("/{integration_id}", response_model=IntegrationResponse)
@@ -61,23 +73,25 @@ async def update_integration(
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user_optional),
 ):
-    result = await db.execute(
-        select(Integration).where(Integration.id == integration_id, Integration.user_id == user.id)
-    )
-    integration = result.scalar_one_or_none()
-    if not integration:
-        raise HTTPException(status_code=404, detail="Integration not found")
-
     update_data = payload.model_dump(exclude_unset=True)
     if "credentials" in update_data:
         update_data["credentials_encrypted"] = encrypt_credentials(update_data.pop("credentials"))
-    if "metadata" in update_data:
-        update_data["metadata_"] = update_data.pop("metadata")
-
-    for key, value in update_data.items():
-        setattr(integration, key, value)
+        invalidate_cached_credentials(integration_id)
 
-    await db.flush()
+    if update_data:
+        # Single statement both authorizes (user_id) and mutates
+        stmt = (
+            update(Integration)
+            .where(Integration.id == integration_id, Integration.user_id == user.id)
+            .values(**update_data)
+            .returning(Integration)
+        )
+    else:
+        stmt = select(Integration).where(Integration.id == integration_id, Integration.user_id == user.id)
+    result = await db.execute(stmt)
+    integration = result.scalar_one_or_none()
+    if not integration:
+        raise HTTPException(status_code=404, detail="Integration not found")
     return IntegrationResponse.model_validate(integration)
 
 
@@ -1,36 +1,60 @@
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func, literal_column
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.orm import selectinload
 from app.database import get_db
 from app.models.run import WorkflowRun, NodeRun
-from app.models.workflow import Workflow
 from app.models.user import User
-from app.schemas.run import WorkflowRunResponse
+from app.schemas.run import WorkflowRunResponse, WorkflowRunListResponse
 from app.utils.auth import get_current_user_optional
 
 router = APIRouter(prefix="/runs", tags=["runs"])
 
+# Node run columns returned by list_runs; the JSONB payloads are left in TOAST
+_NODE_RUN_SUMMARY_COLUMNS = (
+    NodeRun.id,
+    NodeRun.node_id,
+    NodeRun.node_key,
+    NodeRun.status,
+    NodeRun.execution_time_ms,
+    NodeRun.started_at,
+    NodeRun.completed_at,
+)
+_NODE_RUN_SUMMARY_JSON = func.jsonb_build_object(
+    *(arg for col in _NODE_RUN_SUMMARY_COLUMNS for arg in (literal_column(f"'{col.key}'"), col))
+)
 
-@router.get("", response_model=list[WorkflowRunResponse])
+
+@router.get("", response_model=list[WorkflowRunListResponse])
 async def list_runs(
     workflow_id: UUID | None = None,
     limit: int = 50,
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user_optional),
 ):
+    # Aggregate node runs server-side so the whole page comes back in one query
+    node_runs = func.coalesce(
+        func.jsonb_agg(
+            aggregate_order_by(
+                _NODE_RUN_SUMMARY_JSON,
+                NodeRun.started_at,
+            )
+        ).filter(NodeRun.id.is_not(None)),
+        literal_column("'[]'::jsonb"),
+    ).label("node_runs")
     query = (
-        select(WorkflowRun)
-        .options(selectinload(WorkflowRun.node_runs))
-        .join(Workflow, WorkflowRun.workflow_id == Workflow.id)
-        .where(Workflow.user_id == user.id)
+        select(WorkflowRun.__table__, node_runs)
+        .outerjoin(NodeRun, NodeRun.run_id == WorkflowRun.id)
+        .where(WorkflowRun.user_id == user.id)
+        .group_by(WorkflowRun.id)
     )
     if workflow_id:
         query = query.where(WorkflowRun.workflow_id == workflow_id)
     query = query.order_by(WorkflowRun.started_at.desc()).limit(limit)
     result = await db.execute(query)
-    return [WorkflowRunResponse.model_validate(r) for r in result.scalars().all()]
+    return [WorkflowRunListResponse.model_validate(dict(row)) for row in result.mappings()]
 
 
 @router.get("/{run_id}", response_model=WorkflowRunResponse)
@@ -42,8 +66,7 @@ async def get_run(
     result = await db.execute(
         select(WorkflowRun)
         .options(selectinload(WorkflowRun.node_runs))
-        .join(Workflow, WorkflowRun.workflow_id == Workflow.id)
-        .where(WorkflowRun.id == run_id, Workflow.user_id == user.id)
+        .where(WorkflowRun.id == run_id, WorkflowRun.user_id == user.id)
     )
     run = result.scalar_one_or_none()
     if not run:
@@ -2,9 +2,12 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, Request, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm import selectinload, defer
 from app.database import get_db
 from app.models.workflow import Workflow
-from app.engine.executor import WorkflowExecutor
+from app.models.run import WorkflowRun
+from app.engine.executor import WorkflowExecutor, PayloadTooLarge, MAX_INPUT_PAYLOAD_BYTES
+from app.services import webhook_cache
 from app.schemas.run import WorkflowRunResponse
 
 router = APIRouter(prefix="/webhook", tags=["webhooks"])
@@ -16,16 +19,39 @@ async def trigger_webhook(
     request: Request,
     db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(select(Workflow).where(Workflow.id == workflow_id, Workflow.status == "published"))
+    if webhook_cache.is_known_unpublished(workflow_id):
+        raise HTTPException(status_code=404, detail="Workflow not found or not published")
+
+    result = await db.execute(
+        select(Workflow)
+        .options(defer(Workflow.metadata_, raiseload=True))
+        .where(Workflow.id == workflow_id, Workflow.status == "published")
+    )
     workflow = result.scalar_one_or_none()
+    webhook_cache.remember_published(workflow_id, workflow is not None)
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found or not published")
 
+    # Cheap early reject; the executor still maps the stored-size CHECK,
+    # which can differ from the body length, to PayloadTooLarge
+    body = await request.body()
+    if len(body) > MAX_INPUT_PAYLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Trigger payload exceeds {MAX_INPUT_PAYLOAD_BYTES} bytes")
+
     try:
         payload = await request.json()
     except Exception:
         payload = {}
 
     executor = WorkflowExecutor(db)
-    run = await executor.execute(workflow, payload, trigger_type="webhook")
-    return WorkflowRunResponse.model_validate(run)
+    try:
+        run = await executor.execute(workflow, payload, trigger_type="webhook")
+    except PayloadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    result = await db.execute(
+        select(WorkflowRun)
+        .options(selectinload(WorkflowRun.node_runs))
+        .where(WorkflowRun.id == run.id)
+    )
+    return WorkflowRunResponse.model_validate(result.scalar_one())
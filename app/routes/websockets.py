@@ -1,22 +1,90 @@
+import asyncio
+import logging
+from typing import Any
+import orjson
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
 from app.models.user import User
 from app.utils.auth import get_current_user_optional
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Upper bound on events per frame, so one burst can't build an unbounded frame
+MAX_EVENTS_PER_FRAME = 128
+
+
+class BufferedWS:
+    """
+    Write buffer around a WebSocket. Messages are serialized as
+    newline-delimited JSON into one buffer and sent as a single text frame
+    when the buffer passes max_bytes or on flush().
+    """
+
+    def __init__(self, websocket: WebSocket, max_bytes: int = 128 * 1024):
+        self.websocket = websocket
+        self.max_bytes = max_bytes
+        self._buffer = bytearray()
+
+    async def send_json(self, obj: Any) -> None:
+        self._buffer += orjson.dumps(obj)
+        self._buffer += b"\n"
+        if len(self._buffer) >= self.max_bytes:
+            await self.flush()
+
+    async def flush(self) -> None:
+        if self._buffer:
+            data = self._buffer.decode()
+            self._buffer.clear()
+            await self.websocket.send_text(data)
+
+
+async def _writer(websocket: WebSocket, queue: asyncio.Queue) -> None:
+    """
+    Drain-and-coalesce sender: block for the first event, then take whatever
+    else is already queued. Batches accumulate in the buffer while more events
+    keep arriving and go out once the queue is empty (or the buffer is full).
+    A failed send closes the socket so the receive loop ends too.
+    """
+    out = BufferedWS(websocket)
+    try:
+        while True:
+            batch: list[dict[str, Any]] = [await queue.get()]
+            while len(batch) < MAX_EVENTS_PER_FRAME:
+                try:
+                    batch.append(queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            await out.send_json({"type": "batch", "events": batch})
+            if queue.empty():
+                await out.flush()
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        logger.exception("WebSocket writer failed; closing the connection")
+        try:
+            await websocket.close(code=1011)
+        except Exception:
+            pass
 
 
 @router.websocket("/ws/execution")
 async def websocket_execution(websocket: WebSocket):
     """
     WebSocket endpoint for real-time workflow execution updates.
-    Currently accepts connections but doesn't stream execution yet.
+    Currently accepts connections but doesn't stream execution yet; events put
+    on the connection's queue are delivered in batched frames.
     """
     await websocket.accept()
+    queue: asyncio.Queue = asyncio.Queue()
+    writer = asyncio.create_task(_writer(websocket, queue))
     try:
         while True:
             # Keep connection alive, wait for messages
             data = await websocket.receive_text()
             # Echo back for now (can be enhanced with real execution streaming)
-            await websocket.send_json({"type": "ping", "message": "connected"})
+            queue.put_nowait({"type": "ping", "message": "connected"})
     except WebSocketDisconnect:
         pass
+    finally:
+        writer.cancel()
+        await asyncio.gather(writer, return_exceptions=True)
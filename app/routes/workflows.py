@@ -1,19 +1,55 @@
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, delete, insert
 from sqlalchemy.orm import selectinload
-from app.database import get_db
-from app.models.workflow import Workflow, WorkflowNode, WorkflowEdge
+from app.database import get_db, async_session
+from app.models.workflow import Workflow, WorkflowNode, WorkflowEdge, WorkflowTrigger
 from app.models.run import WorkflowRun, NodeRun
 from app.models.user import User
 from app.schemas.workflow import WorkflowCreate, WorkflowUpdate, WorkflowResponse
 from app.schemas.run import WorkflowRunResponse
 from app.utils.auth import get_current_user_optional
-from app.engine.executor import WorkflowExecutor
+from app.engine.executor import WorkflowExecutor, PayloadTooLarge, compile_graph
+from app.services import webhook_cache, trigger_index
 
 router = APIRouter(prefix="/workflows", tags=["workflows"])
 
+# Rows per round trip when streaming the workflow list; nodes and edges are
+# selectin-loaded per batch
+LIST_STREAM_BATCH = 100
+
+
+async def _load_workflow(db: AsyncSession, workflow_id: UUID, user_id: UUID | None = None) -> Workflow | None:
+    """Fetch a workflow with its nodes and edges in one query plus two bulk SELECTs."""
+    query = (
+        select(Workflow)
+        .options(selectinload(Workflow.nodes), selectinload(Workflow.edges))
+        .where(Workflow.id == workflow_id)
+    )
+    if user_id is not None:
+        query = query.where(Workflow.user_id == user_id)
+    result = await db.execute(query)
+    return result.scalar_one_or_none()
+
+
+def _trigger_rows(workflow_id: UUID, nodes) -> list[dict]:
+    """workflow_triggers rows for email trigger nodes bound to an integration."""
+    rows = {}
+    for node in nodes:
+        if node.type != "email_trigger" or not isinstance(node.data, dict):
+            continue
+        trigger_config = node.data.get("trigger_config")
+        if not isinstance(trigger_config, dict) or not trigger_config.get("integration_id"):
+            continue
+        try:
+            integration_id = UUID(str(trigger_config["integration_id"]))
+        except ValueError:
+            continue
+        rows[integration_id] = {"workflow_id": workflow_id, "integration_id": integration_id, "type": node.type}
+    return list(rows.values())
+
 
 @router.post("", response_model=WorkflowResponse)
 async def create_workflow(
@@ -29,49 +65,78 @@ async def create_workflow(
         variables=payload.variables,
         metadata_=payload.metadata,
     )
+    workflow.sorted_nodes, workflow.adjacency = compile_graph([n.id for n in payload.nodes], payload.edges)
     db.add(workflow)
     await db.flush()
 
-    # Add nodes
-    for node_data in payload.nodes:
-        node = WorkflowNode(
-            workflow_id=workflow.id,
-            node_key=node_data.id,
-            type=node_data.type,
-            position_x=node_data.position.get("x", 0),
-            position_y=node_data.position.get("y", 0),
-            data=node_data.data,
-            custom_node_id=UUID(node_data.custom_node_id) if node_data.custom_node_id else None,
+    # Add nodes and edges as executemany INSERTs, outside the unit of work
+    if payload.nodes:
+        await db.execute(
+            insert(WorkflowNode),
+            [
+                {
+                    "workflow_id": workflow.id,
+                    "node_key": node_data.id,
+                    "type": node_data.type,
+                    "position_x": node_data.position.get("x", 0),
+                    "position_y": node_data.position.get("y", 0),
+                    "data": node_data.data,
+                    "custom_node_id": UUID(node_data.custom_node_id) if node_data.custom_node_id else None,
+                }
+                for node_data in payload.nodes
+            ],
         )
-        db.add(node)
-
-    # Add edges
-    for edge_data in payload.edges:
-        edge = WorkflowEdge(
-            workflow_id=workflow.id,
-            source=edge_data.source,
-            target=edge_data.target,
-            source_handle=edge_data.source_handle,
-            target_handle=edge_data.target_handle,
-            condition=edge_data.condition,
+    if payload.edges:
+        await db.execute(
+            insert(WorkflowEdge),
+            [
+                {
+                    "workflow_id": workflow.id,
+                    "source": edge_data.source,
+                    "target": edge_data.target,
+                    "source_handle": edge_data.source_handle,
+                    "target_handle": edge_data.target_handle,
+                    "condition": edge_data.condition,
+                }
+                for edge_data in payload.edges
+            ],
         )
-        db.add(edge)
-
-    await db.flush()
+    triggers = _trigger_rows(workflow.id, payload.nodes)
+    if triggers:
+        await db.execute(insert(WorkflowTrigger), triggers)
 
-    # Refresh to get relationships
-    result = await db.execute(select(Workflow).where(Workflow.id == workflow.id))
-    workflow = result.scalar_one()
+    # Load the relationships populated via workflow_id above
+    await db.refresh(workflow, attribute_names=["nodes", "edges"])
+    # Commit before invalidating, so a concurrent poll can't rebuild the index
+    # from the pre-commit state and keep it for the TTL
+    await db.commit()
+    trigger_index.invalidate(user.id)
     return WorkflowResponse.model_validate(workflow)
 
 
+async def _stream_workflows(user_id: UUID):
+    """Encode the user's workflows into a JSON array one row at a time."""
+    # The response body is produced after the endpoint returns, so it reads
+    # through its own session rather than the request-scoped get_db one
+    async with async_session() as db:
+        rows = await db.stream_scalars(
+            select(Workflow)
+            .options(selectinload(Workflow.nodes), selectinload(Workflow.edges))
+            .where(Workflow.user_id == user_id)
+            .execution_options(yield_per=LIST_STREAM_BATCH)
+        )
+        yield b"["
+        first = True
+        async for workflow in rows:
+            chunk = WorkflowResponse.model_validate(workflow).model_dump_json().encode()
+            yield chunk if first else b"," + chunk
+            first = False
+        yield b"]"
+
+
 @router.get("", response_model=list[WorkflowResponse])
-async def list_workflows(
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user_optional),
-):
-    result = await db.execute(select(Workflow).where(Workflow.user_id == user.id))
-    return [WorkflowResponse.model_validate(w) for w in result.scalars().all()]
+async def list_workflows(user: User = Depends(get_current_user_optional)):
+    return StreamingResponse(_stream_workflows(user.id), media_type="application/json")
 
 
 @router.get("/{workflow_id}", response_model=WorkflowResponse)
@@ -80,8 +145,7 @@ async def get_workflow(
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user_optional),
 ):
-    result = await db.execute(select(Workflow).where(Workflow.id == workflow_id, Workflow.user_id == user.id))
-    workflow = result.scalar_one_or_none()
+    workflow = await _load_workflow(db, workflow_id, user.id)
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
     return WorkflowResponse.model_validate(workflow)
@@ -94,21 +158,27 @@ async def update_workflow(
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user_optional),
 ):
-    result = await db.execute(select(Workflow).where(Workflow.id == workflow_id, Workflow.user_id == user.id))
-    workflow = result.scalar_one_or_none()
+    workflow = await _load_workflow(db, workflow_id, user.id)
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
 
-    update_data = payload.model_dump(exclude_unset=True)
+    # Only the fields the client sent; read straight off the model, no dump
+    fields = payload.model_fields_set
+    nodes_changed = "nodes" in fields and payload.nodes is not None
+    edges_changed = "edges" in fields and payload.edges is not None
+
+    # Recompute the persisted execution order when the graph changes
+    if nodes_changed or edges_changed:
+        node_keys = [n.id for n in payload.nodes] if nodes_changed else [n.node_key or str(n.id) for n in workflow.nodes]
+        edges = payload.edges if edges_changed else workflow.edges
+        workflow.sorted_nodes, workflow.adjacency = compile_graph(node_keys, edges)
 
     # Handle nodes update
-    if "nodes" in update_data and update_data["nodes"] is not None:
-        # Delete existing nodes
-        for existing_node in workflow.nodes:
-            await db.delete(existing_node)
-        # Add new nodes
-        for node_data in payload.nodes:
-            node = WorkflowNode(
+    if nodes_changed:
+        # Replace existing nodes: one DELETE, then batched INSERTs
+        await db.execute(delete(WorkflowNode).where(WorkflowNode.workflow_id == workflow.id))
+        db.add_all([
+            WorkflowNode(
                 workflow_id=workflow.id,
                 node_key=node_data.id,
                 type=node_data.type,
@@ -117,15 +187,18 @@ async def update_workflow(
                 data=node_data.data,
                 custom_node_id=UUID(node_data.custom_node_id) if node_data.custom_node_id else None,
             )
-            db.add(node)
-        del update_data["nodes"]
+            for node_data in payload.nodes
+        ])
+        await db.execute(delete(WorkflowTrigger).where(WorkflowTrigger.workflow_id == workflow.id))
+        triggers = _trigger_rows(workflow.id, payload.nodes)
+        if triggers:
+            await db.execute(insert(WorkflowTrigger), triggers)
 
     # Handle edges update
-    if "edges" in update_data and update_data["edges"] is not None:
-        for existing_edge in workflow.edges:
-            await db.delete(existing_edge)
-        for edge_data in payload.edges:
-            edge = WorkflowEdge(
+    if edges_changed:
+        await db.execute(delete(WorkflowEdge).where(WorkflowEdge.workflow_id == workflow.id))
+        db.add_all([
+            WorkflowEdge(
                 workflow_id=workflow.id,
                 source=edge_data.source,
                 target=edge_data.target,
@@ -133,20 +206,23 @@ async def update_workflow(
                 target_handle=edge_data.target_handle,
                 condition=edge_data.condition,
             )
-            db.add(edge)
-        del update_data["edges"]
-
-    # Handle metadata rename
-    if "metadata" in update_data:
-        update_data["metadata_"] = update_data.pop("metadata")
+            for edge_data in payload.edges
+        ])
 
-    for key, value in update_data.items():
+    for name in fields - {"nodes", "edges"}:
+        value = getattr(payload, name)
         if value is not None:
-            setattr(workflow, key, value)
+            setattr(workflow, name, value)
 
     await db.flush()
-    result = await db.execute(select(Workflow).where(Workflow.id == workflow.id))
-    workflow = result.scalar_one()
+    # Reload so nodes/edges reflect the replaced rows, not the stale collections
+    await db.refresh(workflow, attribute_names=["nodes", "edges"])
+    # Commit before invalidating, so a concurrent webhook can't re-cache the
+    # old committed status in between
+    await db.commit()
+    if "status" in fields:
+        webhook_cache.invalidate(workflow.id)
+    trigger_index.invalidate(user.id)
     return WorkflowResponse.model_validate(workflow)
 
 
@@ -156,14 +232,13 @@ async def publish_workflow(
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user_optional),
 ):
-    result = await db.execute(select(Workflow).where(Workflow.id == workflow_id, Workflow.user_id == user.id))
-    workflow = result.scalar_one_or_none()
+    workflow = await _load_workflow(db, workflow_id, user.id)
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
     workflow.status = "published"
-    await db.flush()
-    result = await db.execute(select(Workflow).where(Workflow.id == workflow.id))
-    workflow = result.scalar_one()
+    await db.commit()
+    webhook_cache.invalidate(workflow.id)
+    trigger_index.invalidate(user.id)
     return WorkflowResponse.model_validate(workflow)
 
 
@@ -173,14 +248,13 @@ async def unpublish_workflow(
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user_optional),
 ):
-    result = await db.execute(select(Workflow).where(Workflow.id == workflow_id, Workflow.user_id == user.id))
-    workflow = result.scalar_one_or_none()
+    workflow = await _load_workflow(db, workflow_id, user.id)
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
     workflow.status = "draft"
-    await db.flush()
-    result = await db.execute(select(Workflow).where(Workflow.id == workflow.id))
-    workflow = result.scalar_one()
+    await db.commit()
+    webhook_cache.invalidate(workflow.id)
+    trigger_index.invalidate(user.id)
     return WorkflowResponse.model_validate(workflow)
 
 
@@ -190,30 +264,36 @@ async def delete_workflow(
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user_optional),
 ):
-    result = await db.execute(select(Workflow).where(Workflow.id == workflow_id, Workflow.user_id == user.id))
-    workflow = result.scalar_one_or_none()
+    workflow = await _load_workflow(db, workflow_id, user.id)
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
     await db.delete(workflow)
+    await db.commit()
+    webhook_cache.invalidate(workflow_id)
+    trigger_index.invalidate(user.id)
     return {"message": "Workflow deleted"}
 
 
 @router.post("/{workflow_id}/run")
 async def run_workflow(
     workflow_id: UUID,
-    payload: dict = {},
+    payload: dict = Body(default_factory=dict),
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user_optional),
 ):
-    result = await db.execute(select(Workflow).where(Workflow.id == workflow_id, Workflow.user_id == user.id))
-    workflow = result.scalar_one_or_none()
+    workflow = await _load_workflow(db, workflow_id, user.id)
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
 
+    # The executor commits at each write, so this session's connection goes
+    # back to the pool while nodes run rather than being held for the whole run
     executor = WorkflowExecutor(db)
-    run = await executor.execute(workflow, payload, trigger_type="manual")
+    try:
+        run = await executor.execute(workflow, payload, trigger_type="manual")
+    except PayloadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
 
-    # Re-fetch with node_runs eagerly loaded (node_runs has lazy="selectin" but
+    # Re-fetch with node_runs eagerly loaded (node_runs is lazy="raise" and
     # the run object returned by executor may be detached from the session)
     result = await db.execute(
         select(WorkflowRun)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, AliasChoices, ConfigDict, field_validator
 from uuid import UUID
 from datetime import datetime
 from typing import Optional, Any
@@ -15,27 +15,24 @@ class IntegrationUpdate(BaseModel):
     name: Optional[str] = None
     type: Optional[str] = None
     credentials: Optional[dict[str, str]] = None
-    metadata: Optional[dict[str, Any]] = None
+    # Accepted as "metadata"; dumps under the ORM attribute name
+    metadata_: Optional[dict[str, Any]] = Field(default=None, alias="metadata")
+
+    model_config = {"populate_by_name": True}
 
 
 class IntegrationResponse(BaseModel):
     id: UUID
     name: str
     type: str
-    metadata: Optional[dict[str, Any]] = {}
+    # Read from the ORM's metadata_ attribute (or a plain "metadata" key)
+    metadata: dict[str, Any] = Field(default_factory=dict, validation_alias=AliasChoices("metadata_", "metadata"))
     created_at: datetime
     updated_at: datetime
 
-    model_config = {"from_attributes": True}
+    model_config = ConfigDict(from_attributes=True, extra="ignore")
 
+    @field_validator("metadata", mode="before")
     @classmethod
-    def model_validate(cls, obj: Any, **kwargs: Any) -> "IntegrationResponse":
-        data = {
-            "id": obj.id,
-            "name": obj.name,
-            "type": obj.type,
-            "metadata": obj.metadata_ or {},
-            "created_at": obj.created_at,
-            "updated_at": obj.updated_at,
-        }
-        return cls(**data)
+    def _none_as_empty(cls, value: Any) -> Any:
+        return {} if value is None else value
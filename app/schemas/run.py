@@ -20,6 +20,20 @@ class NodeRunResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class NodeRunSummary(BaseModel):
+    """Node run without its input/output payloads, for run listings."""
+
+    id: UUID
+    node_id: str
+    node_key: Optional[str] = None
+    status: str
+    execution_time_ms: float
+    started_at: datetime
+    completed_at: Optional[datetime] = None
+
+    model_config = {"from_attributes": True}
+
+
 class WorkflowRunResponse(BaseModel):
     id: UUID
     workflow_id: UUID
@@ -33,3 +47,7 @@ class WorkflowRunResponse(BaseModel):
     node_runs: list[NodeRunResponse] = []
 
     model_config = {"from_attributes": True}
+
+
+class WorkflowRunListResponse(WorkflowRunResponse):
+    node_runs: list[NodeRunSummary] = []
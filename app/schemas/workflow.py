@@ -1,11 +1,11 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, AliasChoices, ConfigDict, field_validator
 from uuid import UUID
 from datetime import datetime
 from typing import Optional, Any
 
 
 class WorkflowNodeSchema(BaseModel):
-    id: str
+    id: str = Field(max_length=64)
     type: str
     position: dict[str, float]
     data: dict[str, Any] = {}
@@ -39,7 +39,10 @@ class WorkflowUpdate(BaseModel):
     nodes: Optional[list[WorkflowNodeSchema]] = None
     edges: Optional[list[WorkflowEdgeSchema]] = None
     variables: Optional[dict[str, Any]] = None
-    metadata: Optional[dict[str, Any]] = None
+    # Accepted as "metadata"; dumps under the ORM attribute name
+    metadata_: Optional[dict[str, Any]] = Field(default=None, alias="metadata")
+
+    model_config = {"populate_by_name": True}
 
 
 class WorkflowNodeResponse(BaseModel):
@@ -71,28 +74,17 @@ class WorkflowResponse(BaseModel):
     description: str
     agent_id: Optional[UUID] = None
     status: str
-    variables: dict
-    metadata: dict = {}
+    variables: dict = Field(default_factory=dict)
+    # Read from the ORM's metadata_ attribute (or a plain "metadata" key)
+    metadata: dict = Field(default_factory=dict, validation_alias=AliasChoices("metadata_", "metadata"))
     nodes: list[WorkflowNodeResponse] = []
     edges: list[WorkflowEdgeResponse] = []
     created_at: datetime
     updated_at: datetime
 
-    model_config = {"from_attributes": True}
+    model_config = ConfigDict(from_attributes=True, extra="ignore")
 
+    @field_validator("variables", "metadata", mode="before")
     @classmethod
-    def model_validate(cls, obj: Any, **kwargs: Any) -> "WorkflowResponse":
-        data = {
-            "id": obj.id,
-            "name": obj.name,
-            "description": obj.description,
-            "agent_id": obj.agent_id,
-            "status": obj.status,
-            "variables": obj.variables or {},
-            "metadata": obj.metadata_ or {},
-            "nodes": [WorkflowNodeResponse.model_validate(n) for n in (obj.nodes or [])],
-            "edges": [WorkflowEdgeResponse.model_validate(e) for e in (obj.edges or [])],
-            "created_at": obj.created_at,
-            "updated_at": obj.updated_at,
-        }
-        return cls(**data)
+    def _none_as_empty(cls, value: Any) -> Any:
+        return {} if value is None else value
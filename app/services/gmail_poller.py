@@ -4,163 +4,262 @@ Polls Gmail accounts and triggers workflows when new emails arrive.
 """
 
 import asyncio
-from datetime import datetime, timedelta
+import logging
+import time
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional
-from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+from cachetools import TTLCache
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from app.config import get_settings
 from app.models.integration import Integration
 from app.models.workflow import Workflow
-from app.services.gmail_service import GmailService
+from app.services.gmail_service import GmailService, HistoryExpiredError
+from app.services import trigger_index
 from app.engine.executor import WorkflowExecutor
-from app.utils.encryption import decrypt_credentials
+from app.utils.encryption import decrypt_credentials_cached, invalidate_cached_credentials
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+# Redis stream of {"integration_id": ...} entries, added when Gmail signals new mail
+GMAIL_EVENTS_STREAM = "gmail:events"
+
+
+async def publish_gmail_event(redis, integration_id: UUID) -> None:
+    """Ask the poller to check one integration now (e.g. from a Gmail watch callback)."""
+    await redis.xadd(GMAIL_EVENTS_STREAM, {"integration_id": str(integration_id)}, maxlen=10_000, approximate=True)
 
 
 class GmailPoller:
     """Polls Gmail accounts and triggers workflows."""
     
-    def __init__(self, db: AsyncSession):
-        self.db = db
+    def __init__(self, session_factory: async_sessionmaker, max_concurrent_runs: int = 5):
+        # Each poll and each triggered run gets its own short-lived session, so
+        # one slow workflow never holds the poller's connection
+        self.session_factory = session_factory
+        self.run_semaphore = asyncio.Semaphore(max_concurrent_runs)
         self.polling_interval = 60
-        self.last_check: Dict[str, datetime] = {}
+        # Full sweep cadence while listening on Redis. Nothing publishes
+        # gmail:events yet (no watch/Pub/Sub callback), so this stays at the
+        # normal polling interval; events only make a poll happen sooner.
+        # Raise it once a producer calls publish_gmail_event().
+        self.full_sweep_interval = self.polling_interval
+        # integration_id -> time.monotonic() of its last poll; bounded so
+        # removed integrations age out instead of accumulating
+        self.last_check: TTLCache = TTLCache(maxsize=10_000, ttl=24 * 3600)
         self.is_running = False
     
     async def start(self):
-        """Start the polling loop."""
+        """
+        Start the polling loop. Every integration is swept each
+        full_sweep_interval; with Redis reachable the wait in between blocks on
+        the events stream, and integrations it names are polled right away.
+        """
         self.is_running = True
-        print("Gmail Poller: Started")
+        logger.info("Gmail Poller: Started")
+        redis = await self._connect_redis()
+        # Only events added from now on
+        last_event_id = f"{int(time.time() * 1000)}-0"
+        next_sweep = 0.0
         
         while self.is_running:
+            if redis is None or time.monotonic() >= next_sweep:
+                try:
+                    await self._poll_all_gmail_integrations()
+                except Exception:
+                    logger.exception("Gmail Poller error")
+                if redis is None:
+                    await asyncio.sleep(self.polling_interval)
+                    continue
+                next_sweep = time.monotonic() + self.full_sweep_interval
+            
+            block_ms = max(1, int((next_sweep - time.monotonic()) * 1000))
             try:
-                await self._poll_all_gmail_integrations()
+                response = await redis.xread({GMAIL_EVENTS_STREAM: last_event_id}, block=block_ms, count=100)
             except Exception as e:
-                print(f"Gmail Poller error: {e}")
+                logger.warning("Gmail Poller: Redis unavailable (%s), falling back to interval polling", e)
+                redis = None
+                continue
             
-            await asyncio.sleep(self.polling_interval)
+            integration_ids = set()
+            for _stream, entries in response or []:
+                for event_id, fields in entries:
+                    last_event_id = event_id
+                    try:
+                        integration_ids.add(UUID(fields.get("integration_id", "")))
+                    except ValueError:
+                        continue
+            if integration_ids:
+                try:
+                    await self._poll_all_gmail_integrations(integration_ids)
+                except Exception:
+                    logger.exception("Gmail Poller error")
+        
+        if redis is not None:
+            await redis.aclose()
+    
+    async def _connect_redis(self):
+        """Redis client for the events stream, or None to keep interval polling."""
+        if aioredis is None:
+            return None
+        redis = aioredis.from_url(get_settings().REDIS_URL, decode_responses=True)
+        try:
+            await redis.ping()
+        except Exception as e:
+            logger.info("Gmail Poller: Redis not reachable (%s), using interval polling", e)
+            await redis.aclose()
+            return None
+        return redis
     
     async def stop(self):
         """Stop the polling loop."""
         self.is_running = False
-        print("Gmail Poller: Stopped")
+        logger.info("Gmail Poller: Stopped")
     
-    async def _poll_all_gmail_integrations(self):
-        """Poll all active Gmail integrations."""
-        result = await self.db.execute(
-            select(Integration).where(
+    async def _poll_all_gmail_integrations(self, integration_ids: Optional[set] = None):
+        """Poll all active Gmail integrations, or only those in integration_ids."""
+        async with self.session_factory() as db:
+            query = select(Integration).where(
                 Integration.type == "gmail",
                 Integration.status == "active"
             )
-        )
-        integrations = result.scalars().all()
-        
-        for integration in integrations:
-            try:
-                await self._poll_integration(integration)
-            except Exception as e:
-                print(f"Error polling integration {integration.id}: {e}")
+            if integration_ids is not None:
+                query = query.where(Integration.id.in_(integration_ids))
+            result = await db.execute(query)
+            integrations = result.scalars().all()
+            
+            for integration in integrations:
+                try:
+                    await self._poll_integration(integration, db)
+                    await db.commit()
+                except Exception as e:
+                    await db.rollback()
+                    logger.error("Error polling integration %s: %s", integration.id, e)
     
-    async def _poll_integration(self, integration: Integration):
-        """Poll a specific Gmail integration."""
+    async def _poll_integration(self, integration: Integration, db: AsyncSession):
+        """Poll a specific Gmail integration; changes are left for the caller to commit."""
         try:
-            credentials = decrypt_credentials(integration.credentials_encrypted)
+            credentials = decrypt_credentials_cached(integration.id, integration.credentials_encrypted)
             gmail_service = GmailService(credentials)
             
             integration_key = str(integration.id)
-            last_check = self.last_check.get(integration_key)
+            metadata = integration.metadata_ or {}
+            history_id = metadata.get("history_id")
+            messages = None
             
-            if last_check:
-                messages = gmail_service.get_messages_since(
-                    since_datetime=last_check,
-                    max_results=50
-                )
-            else:
-                messages = gmail_service.get_unread_messages(max_results=10)
+            # Incremental path: only the messages added since the last poll
+            if history_id:
+                try:
+                    messages, history_id = gmail_service.get_messages_since_history(history_id, max_results=50)
+                except HistoryExpiredError:
+                    logger.info("Gmail Poller: historyId expired for integration %s, re-bootstrapping", integration.id)
+                    history_id = None
+            
+            # Bootstrap: one full fetch, then remember where the mailbox is now
+            if not history_id:
+                history_id = gmail_service.get_history_id()
+                last_check = self.last_check.get(integration_key)
+                if last_check is not None:
+                    # Wall-clock time only for the API query, from elapsed monotonic time
+                    since = datetime.now(timezone.utc) - timedelta(seconds=time.monotonic() - last_check)
+                    messages = gmail_service.get_messages_since(
+                        since_datetime=since,
+                        max_results=50
+                    )
+                else:
+                    messages = gmail_service.get_unread_messages(max_results=10)
             
-            self.last_check[integration_key] = datetime.utcnow()
+            self.last_check[integration_key] = time.monotonic()
+            if metadata.get("history_id") != history_id:
+                # Reassign so the JSONB change is tracked
+                integration.metadata_ = {**metadata, "history_id": history_id}
+                await db.flush()
             
             if messages:
-                print(f"Gmail Poller: Found {len(messages)} new messages for integration {integration.id}")
-                await self._trigger_workflows(integration, messages)
+                logger.debug("Gmail Poller: Found %d new messages for integration %s", len(messages), integration.id)
+                await self._trigger_workflows(integration, messages, db)
             
             updated_creds = gmail_service.get_updated_credentials()
             if updated_creds.get("access_token") != credentials.get("access_token"):
                 from app.utils.encryption import encrypt_credentials
                 integration.credentials_encrypted = encrypt_credentials(updated_creds)
-                await self.db.flush()
+                invalidate_cached_credentials(integration.id)
+                await db.flush()
             
-        except Exception as e:
-            print(f"Error in _poll_integration for {integration.id}: {e}")
+        except Exception:
+            logger.exception("Error in _poll_integration for %s", integration.id)
             raise
     
-    async def _trigger_workflows(self, integration: Integration, messages: List[Dict]):
-        """Trigger workflows for new messages."""
-        result = await self.db.execute(
-            select(Workflow).where(
-                Workflow.user_id == integration.user_id,
-                Workflow.status == "published"
-            )
-        )
-        workflows = result.scalars().all()
-        
-        gmail_workflows = []
-        for workflow in workflows:
-            nodes = workflow.nodes or []
-            for node in nodes:
-                # nodes are WorkflowNode ORM objects
-                node_type = node.type if hasattr(node, "type") else node.get("type")
-                node_data = node.data if hasattr(node, "data") else node.get("data", {})
-                if not isinstance(node_data, dict):
-                    node_data = {}
-
-                if node_type == "email_trigger":
-                    trigger_config = node_data.get("trigger_config", {})
-                    if not isinstance(trigger_config, dict):
-                        trigger_config = {}
-                    if trigger_config.get("integration_id") == str(integration.id):
-                        gmail_workflows.append(workflow)
-                        break
+    async def _trigger_workflows(self, integration: Integration, messages: List[Dict], db: AsyncSession):
+        """Trigger workflows for new messages, running them concurrently."""
+        workflow_ids = await trigger_index.workflows_for_integration(db, integration.user_id, integration.id)
         
-        if not gmail_workflows:
-            print(f"No workflows configured for Gmail integration {integration.id}")
+        if not workflow_ids:
+            logger.debug("No workflows configured for Gmail integration %s", integration.id)
             return
         
-        executor = WorkflowExecutor(self.db)
-        
+        integration_key = str(integration.id)
+        tasks = []
         for message in messages:
-            for workflow in gmail_workflows:
+            # Built once per message and shared read-only by every workflow it triggers
+            trigger_payload = {
+                "trigger_type": "gmail",
+                "integration_id": integration_key,
+                "body": {
+                    "message_id": message.get("message_id"),
+                    "thread_id": message.get("thread_id"),
+                    "subject": message.get("subject"),
+                    "sender": message.get("sender"),
+                    "to": message.get("to"),
+                    "body": message.get("body"),
+                    "email_content": message.get("body"),
+                    "attachments": message.get("attachments", []),
+                    "received_at": message.get("received_at"),
+                    "snippet": message.get("snippet"),
+                    "labels": message.get("labels", [])
+                }
+            }
+            logger.debug("Triggering %d workflow(s) for email: %s", len(workflow_ids), message.get("subject"))
+            tasks.extend(self._run_workflow(workflow_id, trigger_payload) for workflow_id in workflow_ids)
+        
+        # Commit the new history_id and hand the connection back to the pool
+        # before the runs, which can take minutes and each use their own session
+        await db.commit()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def _run_workflow(self, workflow_id, trigger_payload: dict):
+        """Execute one workflow in its own session, bounded by run_semaphore."""
+        async with self.run_semaphore:
+            async with self.session_factory() as db:
                 try:
-                    trigger_payload = {
-                        "trigger_type": "gmail",
-                        "integration_id": str(integration.id),
-                        "body": {
-                            "message_id": message.get("message_id"),
-                            "thread_id": message.get("thread_id"),
-                            "subject": message.get("subject"),
-                            "sender": message.get("sender"),
-                            "to": message.get("to"),
-                            "body": message.get("body"),
-                            "email_content": message.get("body"),
-                            "attachments": message.get("attachments", []),
-                            "received_at": message.get("received_at"),
-                            "snippet": message.get("snippet"),
-                            "labels": message.get("labels", [])
-                        }
-                    }
-                    
-                    print(f"Triggering workflow {workflow.id} for email: {message.get('subject')}")
-                    await executor.execute(workflow, trigger_payload, trigger_type="gmail")
-                    
-                except Exception as e:
-                    print(f"Error executing workflow {workflow.id}: {e}")
+                    result = await db.execute(
+                        select(Workflow)
+                        .options(selectinload(Workflow.nodes), selectinload(Workflow.edges))
+                        .where(Workflow.id == workflow_id)
+                    )
+                    workflow = result.scalar_one()
+                    await WorkflowExecutor(db).execute(workflow, trigger_payload, trigger_type="gmail")
+                    await db.commit()
+                except Exception:
+                    await db.rollback()
+                    logger.exception("Error executing workflow %s", workflow_id)
 
 
 _poller_instance: Optional[GmailPoller] = None
 
 
-async def start_gmail_poller(db: AsyncSession):
+async def start_gmail_poller(session_factory: async_sessionmaker):
     """Start the global Gmail poller instance."""
     global _poller_instance
     if _poller_instance is None:
-        _poller_instance = GmailPoller(db)
+        _poller_instance = GmailPoller(session_factory)
         asyncio.create_task(_poller_instance.start())
 
 
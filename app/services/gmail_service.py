@@ -3,20 +3,81 @@ Gmail service for fetching and processing emails.
 Supports OAuth2 authentication and polling for new messages.
 """
 
-import base64
+import asyncio
+import binascii
 import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional, List, Dict, Any
+import httpx
+import orjson
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
 from googleapiclient.errors import HttpError
 
+try:
+    # Optional SIMD base64 codec with the same API as the stdlib module
+    from pybase64 import urlsafe_b64decode as _urlsafe_b64decode
+except ImportError:
+    _URLSAFE_TO_STD = str.maketrans("-_", "+/")
+
+    def _urlsafe_b64decode(data: str) -> bytes:
+        # base64.urlsafe_b64decode copies the input twice (str -> bytes, then
+        # translate) before decoding; translate once and decode the str directly
+        return binascii.a2b_base64(data.translate(_URLSAFE_TO_STD))
+
+logger = logging.getLogger(__name__)
+
+# Gmail allows 100 calls per batch but rate-limits batches above ~50
+MESSAGE_BATCH_SIZE = 50
+
+# Concurrent REST fetches, used when batch requests fail or are disabled;
+# capped to stay inside Gmail's per-user request rate
+MESSAGES_URL = "https://gmail.googleapis.com/gmail/v1/users/me/messages"
+MESSAGE_FETCH_CONCURRENCY = 20
+
+
+@lru_cache(maxsize=None)
+def _gmail_discovery_doc() -> Optional[str]:
+    """The Gmail v1 discovery document bundled with google-api-python-client, read once."""
+    return get_static_doc('gmail', 'v1')
+
+
+def _build_gmail_service(credentials: Credentials):
+    doc = _gmail_discovery_doc()
+    if doc is None:
+        return build('gmail', 'v1', credentials=credentials, cache_discovery=False)
+    # Parsed per instance: the client library annotates the method
+    # descriptions in place, so the dict must not be shared
+    return build_from_document(orjson.loads(doc), credentials=credentials)
+
+
+def _format_internal_date(ms: int) -> str:
+    """Gmail internalDate (ms since epoch) as an ISO 8601 UTC string, without a datetime."""
+    seconds, millis = divmod(ms, 1000)
+    text = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds))
+    return f"{text}.{millis * 1000:06d}" if millis else text
+
+
+class HistoryExpiredError(Exception):
+    """The stored historyId is too old for users.history.list; re-bootstrap."""
+
 
 class GmailService:
     """Service for interacting with Gmail API."""
     
-    def __init__(self, credentials_dict: dict):
+    # Set False to always use concurrent REST fetches instead of batch requests
+    use_batch = True
+    
+    # Lowercased header names _parse_message pulls out of each message
+    _WANTED_HEADERS = frozenset({'subject', 'from', 'to', 'date'})
+    
+    def __init__(self, credentials_dict: dict, include_raw_headers: bool = False):
         """
         Initialize Gmail service with OAuth2 credentials.
         
@@ -30,7 +91,10 @@ class GmailService:
                     "client_secret": "...",
                     "scopes": ["https://www.googleapis.com/auth/gmail.readonly"]
                 }
+            include_raw_headers: Add every header to each email dict as
+                "raw_headers"; off by default since the poller never reads them
         """
+        self.include_raw_headers = include_raw_headers
         self.credentials = Credentials(
             token=credentials_dict.get("access_token"),
             refresh_token=credentials_dict.get("refresh_token"),
@@ -43,7 +107,7 @@ class GmailService:
         if self.credentials.expired and self.credentials.refresh_token:
             self.credentials.refresh(Request())
         
-        self.service = build('gmail', 'v1', credentials=self.credentials)
+        self.service = _build_gmail_service(self.credentials)
     
     def get_unread_messages(self, max_results: int = 10, query: str = "is:unread") -> List[Dict[str, Any]]:
         """
@@ -64,14 +128,7 @@ class GmailService:
             ).execute()
             
             messages = results.get('messages', [])
-            processed_emails = []
-            
-            for msg in messages:
-                email_data = self._get_message_details(msg['id'])
-                if email_data:
-                    processed_emails.append(email_data)
-            
-            return processed_emails
+            return self._fetch_messages([msg['id'] for msg in messages])
             
         except HttpError as error:
             raise Exception(f"Gmail API error: {error}")
@@ -98,18 +155,143 @@ class GmailService:
             ).execute()
             
             messages = results.get('messages', [])
-            processed_emails = []
-            
-            for msg in messages:
-                email_data = self._get_message_details(msg['id'])
-                if email_data:
-                    processed_emails.append(email_data)
-            
-            return processed_emails
+            return self._fetch_messages([msg['id'] for msg in messages])
             
         except HttpError as error:
             raise Exception(f"Gmail API error: {error}")
     
+    def get_history_id(self) -> str:
+        """
+        Get the mailbox's current historyId, the starting point for
+        get_messages_since_history().
+        """
+        try:
+            profile = self.service.users().getProfile(userId='me').execute()
+            return str(profile['historyId'])
+        except HttpError as error:
+            raise Exception(f"Gmail API error: {error}")
+
+    def get_messages_since_history(self, start_history_id: str, max_results: int = 50) -> tuple[List[Dict[str, Any]], str]:
+        """
+        Fetch only the messages added since a historyId.
+
+        Args:
+            start_history_id: historyId from a previous call or get_history_id()
+            max_results: Maximum number of messages to fetch
+
+        Returns:
+            (processed email dictionaries, historyId to resume from next time)
+
+        Raises:
+            HistoryExpiredError: start_history_id is no longer available
+        """
+        message_ids: List[str] = []
+        seen = set()
+        latest_history_id = start_history_id
+        page_token = None
+
+        try:
+            while True:
+                response = self.service.users().history().list(
+                    userId='me',
+                    startHistoryId=start_history_id,
+                    historyTypes=['messageAdded'],
+                    pageToken=page_token
+                ).execute()
+                latest_history_id = str(response.get('historyId', latest_history_id))
+
+                for record in response.get('history', []):
+                    for added in record.get('messagesAdded', []):
+                        msg_id = added['message']['id']
+                        if msg_id not in seen:
+                            seen.add(msg_id)
+                            message_ids.append(msg_id)
+
+                page_token = response.get('nextPageToken')
+                if not page_token:
+                    break
+        except HttpError as error:
+            if error.resp.status == 404:
+                raise HistoryExpiredError(start_history_id)
+            raise Exception(f"Gmail API error: {error}")
+
+        return self._fetch_messages(message_ids[-max_results:]), latest_history_id
+
+    def _fetch_messages(self, message_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Fetch and parse messages through batch requests, one HTTP round-trip
+        per MESSAGE_BATCH_SIZE ids. Messages that fail individually are
+        skipped; order follows message_ids.
+        """
+        if not message_ids:
+            return []
+        if not self.use_batch:
+            return self._fetch_messages_concurrent(message_ids)
+
+        fetched: Dict[str, Dict] = {}
+
+        def on_response(request_id, response, exception):
+            if exception is not None:
+                logger.warning("Error fetching message %s: %s", request_id, exception)
+            else:
+                fetched[request_id] = response
+
+        try:
+            for start in range(0, len(message_ids), MESSAGE_BATCH_SIZE):
+                batch = self.service.new_batch_http_request(callback=on_response)
+                for msg_id in message_ids[start:start + MESSAGE_BATCH_SIZE]:
+                    batch.add(
+                        self.service.users().messages().get(userId='me', id=msg_id, format='full'),
+                        request_id=msg_id
+                    )
+                batch.execute()
+        except HttpError as error:
+            logger.warning("Gmail batch request failed (%s), fetching messages concurrently", error)
+            return self._fetch_messages_concurrent(message_ids)
+
+        return [
+            self._parse_message(fetched[msg_id], self.include_raw_headers)
+            for msg_id in message_ids if msg_id in fetched
+        ]
+
+    def _fetch_messages_concurrent(self, message_ids: List[str]) -> List[Dict[str, Any]]:
+        """Blocking wrapper around fetch_messages_async for the synchronous API above."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.fetch_messages_async(message_ids))
+        # Called from inside an event loop: run on a private loop in a worker thread
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(asyncio.run, self.fetch_messages_async(message_ids)).result()
+
+    async def fetch_messages_async(self, message_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Fetch and parse messages with concurrent format=full REST calls, at most
+        MESSAGE_FETCH_CONCURRENCY in flight. Failed messages are skipped; order
+        follows message_ids.
+        """
+        if not message_ids:
+            return []
+        # Refresh once up front so every request shares one valid token
+        if self.credentials.expired and self.credentials.refresh_token:
+            await asyncio.to_thread(self.credentials.refresh, Request())
+        headers = {"Authorization": f"Bearer {self.credentials.token}"}
+        semaphore = asyncio.Semaphore(MESSAGE_FETCH_CONCURRENCY)
+
+        async def fetch(client: httpx.AsyncClient, msg_id: str) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    response = await client.get(f"{MESSAGES_URL}/{msg_id}", params={"format": "full"}, headers=headers)
+                    response.raise_for_status()
+                except httpx.HTTPError as error:
+                    logger.warning("Error fetching message %s: %s", msg_id, error)
+                    return None
+            return self._parse_message(response.json(), self.include_raw_headers)
+
+        async with httpx.AsyncClient(http2=True, timeout=30.0) as client:
+            results = await asyncio.gather(*(fetch(client, msg_id) for msg_id in message_ids))
+        return [email_data for email_data in results if email_data]
+
     def _get_message_details(self, message_id: str) -> Optional[Dict[str, Any]]:
         """
         Get detailed information about a specific message.
@@ -126,90 +308,99 @@ class GmailService:
                 id=message_id,
                 format='full'
             ).execute()
-            
-            headers = message['payload'].get('headers', [])
-            
-            subject = self._get_header(headers, 'Subject')
-            sender = self._get_header(headers, 'From')
-            to = self._get_header(headers, 'To')
-            date = self._get_header(headers, 'Date')
-            
-            body = self._get_message_body(message['payload'])
-            attachments = self._get_attachments(message['payload'])
-            
-            internal_date = message.get('internalDate')
-            received_at = datetime.fromtimestamp(int(internal_date) / 1000).isoformat() if internal_date else date
-            
-            return {
-                "message_id": message_id,
-                "thread_id": message.get('threadId'),
-                "subject": subject or "(No Subject)",
-                "sender": sender or "unknown@example.com",
-                "to": to or "",
-                "body": body,
-                "body_html": body,
-                "attachments": attachments,
-                "received_at": received_at,
-                "labels": message.get('labelIds', []),
-                "snippet": message.get('snippet', ''),
-                "raw_headers": {h['name']: h['value'] for h in headers}
-            }
-            
         except HttpError as error:
-            print(f"Error fetching message {message_id}: {error}")
+            logger.warning("Error fetching message %s: %s", message_id, error)
             return None
+        return self._parse_message(message, self.include_raw_headers)
     
-    def _get_header(self, headers: List[Dict], name: str) -> Optional[str]:
-        """Extract a specific header value."""
-        for header in headers:
-            if header['name'].lower() == name.lower():
-                return header['value']
-        return None
-    
-    def _get_message_body(self, payload: Dict) -> str:
-        """Extract message body from payload."""
-        body = ""
+    @classmethod
+    def _parse_message(cls, message: Dict[str, Any], include_raw_headers: bool = False) -> Dict[str, Any]:
+        """
+        Build the email dictionary from a format='full' message resource. Pure:
+        callable on GmailService itself, without credentials or a built service.
+        """
+        # One pass picks out the wanted headers (first occurrence wins, as a
+        # linear scan would) and, only if asked for, the original-case map
+        wanted_names = cls._WANTED_HEADERS
+        raw_headers = {} if include_raw_headers else None
+        wanted = {}
+        for h in message['payload'].get('headers', []):
+            name, value = h['name'], h['value']
+            if raw_headers is not None:
+                raw_headers[name] = value
+            lname = name.lower()
+            if lname in wanted_names and lname not in wanted:
+                wanted[lname] = value
+        
+        subject = wanted.get('subject')
+        sender = wanted.get('from')
+        to = wanted.get('to')
+        date = wanted.get('date')
+        
+        body, attachments = cls._extract_body_and_attachments(message['payload'])
         
-        if 'parts' in payload:
-            for part in payload['parts']:
-                if part['mimeType'] == 'text/plain':
-                    data = part['body'].get('data', '')
-                    if data:
-                        body = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
-                        break
-                elif part['mimeType'] == 'text/html' and not body:
-                    data = part['body'].get('data', '')
-                    if data:
-                        body = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
-                elif 'parts' in part:
-                    body = self._get_message_body(part)
-                    if body:
-                        break
-        else:
-            data = payload['body'].get('data', '')
-            if data:
-                body = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
+        internal_date = message.get('internalDate')
+        received_at = _format_internal_date(int(internal_date)) if internal_date else date
         
-        return body
+        email_data = {
+            "message_id": message['id'],
+            "thread_id": message.get('threadId'),
+            "subject": subject or "(No Subject)",
+            "sender": sender or "unknown@example.com",
+            "to": to or "",
+            "body": body,
+            "body_html": body,
+            "attachments": attachments,
+            "received_at": received_at,
+            "labels": message.get('labelIds', []),
+            "snippet": message.get('snippet', ''),
+        }
+        if raw_headers is not None:
+            email_data["raw_headers"] = raw_headers
+        return email_data
     
-    def _get_attachments(self, payload: Dict) -> List[Dict[str, Any]]:
-        """Extract attachment information from payload."""
-        attachments = []
+    @classmethod
+    def _extract_body_and_attachments(cls, payload: Dict) -> tuple[str, List[Dict[str, Any]]]:
+        """
+        One iterative walk of the MIME tree. The body is the first text/plain
+        part in document order, else the first text/html part, and only the
+        chosen part is base64-decoded. Parts with a filename are attachments.
+        """
+        if 'parts' not in payload:
+            return cls._decode_body_data(payload['body'].get('data', '')), []
         
-        if 'parts' in payload:
-            for part in payload['parts']:
-                if part.get('filename'):
-                    attachment = {
-                        "filename": part['filename'],
-                        "mime_type": part['mimeType'],
-                        "size": part['body'].get('size', 0),
-                        "attachment_id": part['body'].get('attachmentId')
-                    }
-                    attachments.append(attachment)
-                elif 'parts' in part:
-                    attachments.extend(self._get_attachments(part))
+        attachments = []
+        plain_data = None
+        html_data = None
+        stack = list(reversed(payload['parts']))
+        while stack:
+            part = stack.pop()
+            mime_type = part.get('mimeType')
+            if part.get('filename'):
+                attachments.append({
+                    "filename": part['filename'],
+                    "mime_type": mime_type,
+                    "size": part['body'].get('size', 0),
+                    "attachment_id": part['body'].get('attachmentId')
+                })
+            elif mime_type == 'text/plain':
+                if plain_data is None:
+                    plain_data = part['body'].get('data') or None
+            elif mime_type == 'text/html':
+                if html_data is None:
+                    html_data = part['body'].get('data') or None
+            elif 'parts' in part:
+                stack.extend(reversed(part['parts']))
         
-        return attachments
+        body_data = plain_data or html_data
+        return (cls._decode_body_data(body_data) if body_data else ""), attachments
+    
+    @staticmethod
+    def _decode_body_data(data: str) -> str:
+        """Decode a base64url body part to text."""
+        if not data:
+            return ""
+        return _urlsafe_b64decode(data).decode('utf-8', 'ignore')
     
     def mark_as_read(self, message_id: str) -> bool:
         """
@@ -229,7 +420,7 @@ class GmailService:
             ).execute()
             return True
         except HttpError as error:
-            print(f"Error marking message as read: {error}")
+            logger.warning("Error marking message as read: %s", error)
             return False
     
     def get_updated_credentials(self) -> dict:
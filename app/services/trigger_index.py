@@ -0,0 +1,44 @@
+"""
+In-process index of which published workflows each Gmail integration triggers.
+
+Filled per integration from an indexed lookup on workflow_triggers and reused
+until a workflow of the owning user is created, changed or deleted in this
+process. The TTL bounds how long other workers can serve a stale entry.
+"""
+
+from uuid import UUID
+from cachetools import TTLCache
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.workflow import Workflow, WorkflowTrigger
+
+# user_id -> {integration_id: {workflow_id}}
+_INDEX: TTLCache = TTLCache(maxsize=10_000, ttl=300)
+
+
+def invalidate(user_id: UUID) -> None:
+    """Drop the user's entry; call only after the workflow change has committed."""
+    # A lookup already in flight writes into the dict it fetched before this
+    # pop, which is now detached, so it cannot re-cache the old state
+    _INDEX.pop(user_id, None)
+
+
+async def workflows_for_integration(db: AsyncSession, user_id: UUID, integration_id: UUID) -> set[UUID]:
+    """Ids of the user's published workflows with an email trigger bound to integration_id."""
+    index = _INDEX.get(user_id)
+    if index is None:
+        index = _INDEX[user_id] = {}
+    workflow_ids = index.get(integration_id)
+    if workflow_ids is None:
+        result = await db.execute(
+            select(WorkflowTrigger.workflow_id)
+            .join(Workflow, Workflow.id == WorkflowTrigger.workflow_id)
+            .where(
+                WorkflowTrigger.integration_id == integration_id,
+                WorkflowTrigger.type == "email_trigger",
+                Workflow.user_id == user_id,
+                Workflow.status == "published",
+            )
+        )
+        workflow_ids = index[integration_id] = set(result.scalars().all())
+    return workflow_ids
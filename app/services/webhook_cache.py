@@ -0,0 +1,25 @@
+"""
+In-process cache of which workflows accept webhooks.
+
+Only the negative answer is served from memory: a webhook for an unknown or
+unpublished workflow is rejected without touching the database. Entries are
+dropped when a workflow is published, unpublished or deleted in this process;
+other workers see the change once the TTL expires.
+"""
+
+from uuid import UUID
+from cachetools import TTLCache
+
+_published: TTLCache = TTLCache(maxsize=4096, ttl=60)
+
+
+def is_known_unpublished(workflow_id: UUID) -> bool:
+    return _published.get(workflow_id) is False
+
+
+def remember_published(workflow_id: UUID, published: bool) -> None:
+    _published[workflow_id] = published
+
+
+def invalidate(workflow_id: UUID) -> None:
+    _published.pop(workflow_id, None)
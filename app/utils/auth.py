@@ -1,25 +1,46 @@
+import hashlib
+import threading
+import time
 from datetime import datetime, timedelta
 from uuid import UUID
+from cachetools import TTLCache
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm import make_transient_to_detached
 from app.config import get_settings
 from app.database import get_db
 from app.models.user import User
 
 settings = get_settings()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    bcrypt__rounds=settings.BCRYPT_ROUNDS or (4 if settings.DEV_MODE else 12),
+    deprecated="auto",
+)
+if settings.BCRYPT_WARMUP:
+    pwd_context.hash("warmup")
 security = HTTPBearer()
 
+# Placeholder stored for the DEV_MODE user; not a real bcrypt hash
+DEV_PASSWORD_HASH = "$2b$12$devmodehashnotused"
+
+# sha256(token) -> verified payload. The signature covers the payload, so a hit
+# only needs the exp re-check; hashing avoids keeping raw tokens in memory.
+_token_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+_token_cache_lock = threading.Lock()
+
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
+    if hashed_password == DEV_PASSWORD_HASH:
+        return False
     return pwd_context.verify(plain_password, hashed_password)
 
 
@@ -30,24 +51,68 @@ def create_access_token(user_id: str) -> str:
 
 
 def decode_access_token(token: str) -> dict:
+    key = hashlib.sha256(token.encode()).digest()
+    with _token_cache_lock:
+        payload = _token_cache.get(key)
+    if payload is not None and payload.get("exp", 0) > time.time():
+        return payload
+
     try:
         payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
-        return payload
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    with _token_cache_lock:
+        _token_cache[key] = payload
+    return payload
+
+
+# user id -> detached User snapshot, never handed out directly: each request
+# gets its own copy merged into its session (no SELECT), so nothing a request
+# does to its user leaks into the cache or other requests. Out-of-band changes
+# to a user row (role, deletion) take up to the 30s TTL to be seen, except
+# that logging in refreshes the entry.
+_user_cache: TTLCache = TTLCache(maxsize=10_000, ttl=30)
+# Id of the DEV_MODE user once it has been looked up or created
+_dev_user_id: UUID | None = None
+
+
+def invalidate_cached_user(user_id: UUID) -> None:
+    """Drop the cached snapshot; call after committing a change to the user row."""
+    _user_cache.pop(user_id, None)
+
+
+def _user_id_from_token(token: str) -> UUID:
+    payload = decode_access_token(token)
+    try:
+        return UUID(payload["sub"])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+
+
+def _snapshot(user: User) -> User:
+    """Detached copy of a loaded user's column values, for _user_cache."""
+    copy = User(**{attr.key: getattr(user, attr.key) for attr in User.__mapper__.column_attrs})
+    make_transient_to_detached(copy)
+    return copy
+
+
+async def _load_user(db: AsyncSession, user_id: UUID) -> User | None:
+    cached = _user_cache.get(user_id)
+    if cached is not None:
+        return await db.merge(cached, load=False)
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
+    if user is not None:
+        # Cache a separate detached copy; the request keeps the one it loaded
+        _user_cache[user_id] = _snapshot(user)
+    return user
 
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db),
 ) -> User:
-    payload = decode_access_token(credentials.credentials)
-    user_id = payload.get("sub")
-    if not user_id:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-
-    result = await db.execute(select(User).where(User.id == UUID(user_id)))
-    user = result.scalar_one_or_none()
+    user = await _load_user(db, _user_id_from_token(credentials.credentials))
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
@@ -61,7 +126,12 @@ async def get_current_user_optional(
     Optional auth - in DEV_MODE, creates/returns a dev user automatically.
     In production, requires valid JWT token.
     """
+    global _dev_user_id
     if settings.DEV_MODE:
+        if _dev_user_id is not None:
+            user = await _load_user(db, _dev_user_id)
+            if user:
+                return user
         # Auto-create or get dev user
         result = await db.execute(select(User).where(User.email == "dev@agentkit.local"))
         user = result.scalar_one_or_none()
@@ -69,24 +139,19 @@ async def get_current_user_optional(
             user = User(
                 email="dev@agentkit.local",
                 name="Dev User",
-                hashed_password="$2b$12$devmodehashnotused",
+                hashed_password=DEV_PASSWORD_HASH,
                 role="admin",
             )
             db.add(user)
             await db.flush()
+        _dev_user_id = user.id
         return user
     
     # Production mode - require auth
     if not credentials:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication required")
     
-    payload = decode_access_token(credentials.credentials)
-    user_id = payload.get("sub")
-    if not user_id:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-
-    result = await db.execute(select(User).where(User.id == UUID(user_id)))
-    user = result.scalar_one_or_none()
+    user = await _load_user(db, _user_id_from_token(credentials.credentials))
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
@@ -1,10 +1,26 @@
-import json
 import base64
+import hashlib
+import os
+from functools import lru_cache
+from typing import Hashable
+import orjson
+from cachetools import TTLCache
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from app.config import get_settings
 
+# AES-256-GCM ciphertexts are written as "v2." + base64url(nonce + ciphertext).
+# "." never occurs in base64url, so legacy Fernet tokens can't be mistaken for them.
+_GCM_PREFIX = "v2."
+_GCM_NONCE_BYTES = 12
 
+# key -> (blake2b digest of the ciphertext, decrypted credentials)
+_cred_cache: TTLCache = TTLCache(maxsize=1024, ttl=300)
+
+
+@lru_cache(maxsize=1)
 def _get_fernet() -> Fernet:
+    # Built once per process; Fernet instances are safe to share across threads
     settings = get_settings()
     raw = settings.ENCRYPTION_KEY.encode()
     # Pad or truncate to exactly 32 bytes, then base64url-encode for Fernet
@@ -13,13 +29,48 @@ def _get_fernet() -> Fernet:
     return Fernet(key)
 
 
+@lru_cache(maxsize=1)
+def _get_aesgcm() -> AESGCM:
+    # 32-byte key derived from ENCRYPTION_KEY; AESGCM is stateless and thread-safe
+    return AESGCM(hashlib.sha256(get_settings().ENCRYPTION_KEY.encode()).digest())
+
+
+def reset_fernet_cache() -> None:
+    """Drop the cached ciphers so the next call picks up a changed ENCRYPTION_KEY."""
+    _get_fernet.cache_clear()
+    _get_aesgcm.cache_clear()
+
+
 def encrypt_credentials(credentials: dict) -> str:
-    f = _get_fernet()
-    data = json.dumps(credentials).encode()
-    return f.encrypt(data).decode()
+    nonce = os.urandom(_GCM_NONCE_BYTES)
+    # orjson emits bytes directly; one AES-GCM pass both encrypts and authenticates
+    ciphertext = _get_aesgcm().encrypt(nonce, orjson.dumps(credentials), None)
+    return _GCM_PREFIX + base64.urlsafe_b64encode(nonce + ciphertext).decode("ascii")
 
 
 def decrypt_credentials(encrypted: str) -> dict:
-    f = _get_fernet()
-    data = f.decrypt(encrypted.encode())
-    return json.loads(data.decode())
+    if encrypted.startswith(_GCM_PREFIX):
+        blob = base64.urlsafe_b64decode(encrypted[len(_GCM_PREFIX):])
+        nonce, ciphertext = blob[:_GCM_NONCE_BYTES], blob[_GCM_NONCE_BYTES:]
+        return orjson.loads(_get_aesgcm().decrypt(nonce, ciphertext, None))
+    # Legacy Fernet token; re-encrypted as AES-GCM the next time it is saved
+    return orjson.loads(_get_fernet().decrypt(encrypted.encode("ascii")))
+
+
+def decrypt_credentials_cached(key: Hashable, encrypted: str) -> dict:
+    """
+    decrypt_credentials() memoized per key (e.g. integration id) for a few
+    minutes. The ciphertext digest is checked on every hit, so a rotated
+    credential is never served stale. Returns a copy callers may mutate.
+    """
+    digest = hashlib.blake2b(encrypted.encode(), digest_size=16).digest()
+    cached = _cred_cache.get(key)
+    if cached is not None and cached[0] == digest:
+        return dict(cached[1])
+    credentials = decrypt_credentials(encrypted)
+    _cred_cache[key] = (digest, credentials)
+    return dict(credentials)
+
+
+def invalidate_cached_credentials(key: Hashable) -> None:
+    _cred_cache.pop(key, None)
@@ -4,23 +4,68 @@ Supports: {{trigger.body.email}}, {{node1.output.result}}, {{workflow.variables.
 """
 
 import re
-from typing import Any
+from functools import lru_cache
+from typing import Any, Callable, NamedTuple
 
 
 EXPRESSION_PATTERN = re.compile(r"\{\{(.+?)\}\}")
 
+# Template strings up to this length are compiled once and cached; longer ones
+# (e.g. whole HTML bodies) are rare repeats and interpolated directly
+COMPILE_MAX_LEN = 2048
+
+
+class CompiledTemplate(NamedTuple):
+    """A template string split into literals and the expressions between them."""
+    whole: str | None  # set when the string is exactly one {{expression}}
+    literals: tuple[str, ...]  # always len(exprs) + 1
+    exprs: tuple[str, ...]
+
+
+@lru_cache(maxsize=4096)
+def _compile_path(expression: str) -> tuple[tuple[str, int | None], ...]:
+    """'a.b.0' -> (("a", None), ("b", None), ("0", 0)): dict key plus list index, parsed once."""
+    parts = []
+    for part in expression.strip().split("."):
+        try:
+            index = int(part)
+        except ValueError:
+            index = None
+        parts.append((part, index))
+    return tuple(parts)
+
+
+@lru_cache(maxsize=4096)
+def compile_template(template: str) -> CompiledTemplate:
+    """Parse a template string once; render with the resolver of each call."""
+    return _split_template(template)
+
+
+def _split_template(template: str) -> CompiledTemplate:
+    # split() with one capture group yields [literal, expr, literal, expr, ..., literal]
+    match = EXPRESSION_PATTERN.fullmatch(template)
+    if match:
+        return CompiledTemplate(match.group(1).strip(), (), ())
+    parts = EXPRESSION_PATTERN.split(template)
+    return CompiledTemplate(None, tuple(parts[::2]), tuple(p.strip() for p in parts[1::2]))
+
 
 def resolve_expression(expression: str, context: dict[str, Any]) -> Any:
     """Resolve a single expression like 'trigger.body.email' against context."""
-    parts = expression.strip().split(".")
+    return _resolve_parts(_compile_path(expression), context)
+
+
+def _resolve_parts_py(parts: tuple[tuple[str, int | None], ...], context: Any) -> Any:
     current = context
-    for part in parts:
+    for key, index in parts:
         if isinstance(current, dict):
-            current = current.get(part)
+            current = current.get(key)
         elif isinstance(current, list):
+            if index is None:
+                return None
             try:
-                current = current[int(part)]
-            except (ValueError, IndexError):
+                current = current[index]
+            except IndexError:
                 return None
         else:
             return None
@@ -29,29 +74,123 @@ def resolve_expression(expression: str, context: dict[str, Any]) -> Any:
     return current
 
 
+try:
+    # Optional Cython build of the same walk (see expression_fast.pyx)
+    from app.utils.expression_fast import resolve_parts as _resolve_parts
+except ImportError:
+    _resolve_parts = _resolve_parts_py
+
+
 def interpolate(template: Any, context: dict[str, Any]) -> Any:
     """
     Interpolate expressions in a template string or dict.
     If the entire string is a single expression, return the resolved value directly.
     Otherwise, replace all expressions with their string representations.
     """
-    if isinstance(template, str):
-        # Check if the entire string is a single expression
-        match = EXPRESSION_PATTERN.fullmatch(template)
-        if match:
-            return resolve_expression(match.group(1), context)
+    return _interpolate(template, lambda expr: resolve_expression(expr, context))
+
+
+class FlatContext:
+    """
+    Dotted-path view of a nested context ("trigger.body.subject" -> value).
+    Only paths that templates actually reference are stored: each is resolved
+    by the nested walk on first use, so answers always match interpolate(),
+    and later uses are one dict lookup. Cached paths are grouped by top-level
+    key, and set() drops a key's group when it is reassigned.
+    """
+
+    def __init__(self, context: dict[str, Any]):
+        self.context = context
+        self._paths: dict[str, dict[str, Any]] = {}
 
-        # Replace all expressions in the string
-        def replacer(m: re.Match) -> str:
-            val = resolve_expression(m.group(1), context)
-            return str(val) if val is not None else ""
+    def set(self, key: str, value: Any) -> None:
+        """Assign context[key], forgetting every cached path under it."""
+        self.context[key] = value
+        self._paths.pop(key, None)
 
-        return EXPRESSION_PATTERN.sub(replacer, template)
+    def discard(self, key: str) -> None:
+        """Remove context[key], if present, and its cached paths."""
+        self.context.pop(key, None)
+        self._paths.pop(key, None)
+
+    def resolve(self, expression: str) -> Any:
+        expression = expression.strip()
+        root = expression.partition(".")[0]
+        paths = self._paths.get(root)
+        if paths is None:
+            paths = self._paths[root] = {}
+        try:
+            return paths[expression]
+        except KeyError:
+            value = paths[expression] = resolve_expression(expression, self.context)
+            return value
+
+
+def interpolate_flat(template: Any, view: FlatContext) -> Any:
+    """Same as interpolate(), resolving expressions through a FlatContext."""
+    return _interpolate(template, view.resolve)
+
+
+def _render(compiled: CompiledTemplate, resolve: Callable[[str], Any]) -> Any:
+    if compiled.whole is not None:
+        return resolve(compiled.whole)
+    literals = compiled.literals
+    out = [literals[0]]
+    for expr, literal in zip(compiled.exprs, literals[1:]):
+        val = resolve(expr)
+        out.append(str(val) if val is not None else "")
+        out.append(literal)
+    return "".join(out)
+
+
+def _render_scan(template: str, resolve: Callable[[str], Any]) -> Any:
+    """
+    Render an uncached template in a single finditer pass, appending literal
+    slices (by match offsets) and resolved values straight to the output.
+    """
+    match = EXPRESSION_PATTERN.fullmatch(template)
+    if match:
+        return resolve(match.group(1))
+    out = []
+    pos = 0
+    for m in EXPRESSION_PATTERN.finditer(template):
+        start, end = m.span()
+        out.append(template[pos:start])
+        val = resolve(m.group(1))
+        out.append(str(val) if val is not None else "")
+        pos = end
+    out.append(template[pos:])
+    return "".join(out)
+
+
+def _interpolate(template: Any, resolve: Callable[[str], Any]) -> Any:
+    if isinstance(template, str):
+        if "{{" not in template:
+            return template
+        if len(template) <= COMPILE_MAX_LEN:
+            return _render(compile_template(template), resolve)
+        # Too large to cache: one streaming scan, no compiled form built
+        return _render_scan(template, resolve)
 
     elif isinstance(template, dict):
-        return {k: interpolate(v, context) for k, v in template.items()}
+        return {k: _interpolate(v, resolve) for k, v in template.items()}
 
     elif isinstance(template, list):
-        return [interpolate(item, context) for item in template]
+        return [_interpolate(item, resolve) for item in template]
 
     return template
+
+
+def has_expressions(template: Any) -> bool:
+    """
+    Return True if any string inside template contains a {{...}} marker.
+    Much cheaper than interpolate(): it allocates nothing and stops at the
+    first hit, so config-only nodes can skip interpolation entirely.
+    """
+    if isinstance(template, str):
+        return "{{" in template
+    elif isinstance(template, dict):
+        return any(has_expressions(v) for v in template.values())
+    elif isinstance(template, list):
+        return any(has_expressions(item) for item in template)
+    return False
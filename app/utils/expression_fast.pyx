@@ -0,0 +1,47 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Optional compiled path walk for app.utils.expression.resolve_expression.
+
+Build in place (needs Cython and a C compiler):
+    cythonize -i app/utils/expression_fast.pyx
+expression.py falls back to the pure-Python walk when this isn't built.
+"""
+
+from cpython.dict cimport PyDict_GetItem
+from cpython.object cimport PyObject
+
+
+cpdef object resolve_parts(tuple parts, object context):
+    """Walk context along parts from expression._compile_path(); None if any step is missing."""
+    cdef object current = context
+    cdef tuple part
+    cdef object index
+    cdef PyObject* found
+    cdef Py_ssize_t i, idx, size
+    for i in range(len(parts)):
+        part = <tuple>parts[i]
+        if isinstance(current, dict):
+            found = PyDict_GetItem(current, part[0])
+            if found is NULL:
+                return None
+            current = <object>found
+        elif isinstance(current, list):
+            index = part[1]
+            if index is None:
+                return None
+            try:
+                idx = index
+            except OverflowError:
+                # Beyond Py_ssize_t, so out of range; the Python walk's IndexError path
+                return None
+            size = len(<list>current)
+            if idx < 0:
+                idx += size
+            if idx < 0 or idx >= size:
+                return None
+            current = (<list>current)[idx]
+        else:
+            return None
+        if current is None:
+            return None
+    return current
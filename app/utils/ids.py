@@ -0,0 +1,18 @@
+import os
+import time
+import uuid
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Time-ordered UUID (RFC 9562 version 7): 48-bit unix-ms timestamp followed
+    by random bits, so new primary keys land on the rightmost B-tree pages.
+    """
+    ts_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")
+    value = (ts_ms & 0xFFFF_FFFF_FFFF) << 80
+    value |= 0x7 << 76                       # version
+    value |= ((rand >> 62) & 0xFFF) << 64    # rand_a (12 bits)
+    value |= 0b10 << 62                      # variant
+    value |= rand & 0x3FFF_FFFF_FFFF_FFFF    # rand_b (62 bits)
+    return uuid.UUID(int=value)